@@ -0,0 +1,896 @@
+"""Per-operation latency of the database access paths used by the application
+
+Run with: python benchmark.py [connection] [search] [filters] [checkout] [bills] [tills] [stock] [reports]
+                               [prices] [import] [api] [navigation] [startup]
+          python benchmark.py suite [--sizes 1000 100000 1000000] [--seed 42]
+                                    [--json results.json] [--compare baseline.json]
+
+The suite builds seeded synthetic catalogs, times the headless equivalent of
+each GUI handler against them and can write the results as JSON; --compare
+reports operations that got slower than a saved run and exits non-zero.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+from datetime import datetime, timedelta
+
+import inventory_core
+from catalog import (CatalogCache, CatalogView, category_view, fetch_items, load_categories, search_tokens,
+                     search_view, text_search)
+from catalog_csv import export_file, import_file, import_items
+from database import DEFAULT_CATEGORIES, Database
+from metrics import METRICS
+from prices import price_at, price_list_at
+from receipt import Receipt
+from reports import ROLLUP_TABLES, category_totals, daily_revenue, item_totals, rebuild_rollups
+from sales import format_bill, record_sale
+from stock import on_hand, rebuild_balances
+
+ITEM_COUNT = 1000
+REPEAT = 2000
+SEARCH_ITEM_COUNT = 500000
+SEARCH_LIMIT = 1000
+FILTER_ITEM_COUNT = 1000000
+# (label, search_items filters) timed by bench_filters; none may scan the items table
+FILTER_CASES = (
+    ("item code", dict(item_code="100500000")),
+    ("product code", dict(product_code="S0500000")),
+    ("item name", dict(item_name="3 FOLD BLACK")),
+    ("price", dict(selling_price=950.0)),
+    ("item code prefix", dict(item_code_prefix="1005000")),
+    ("product code prefix", dict(product_code_prefix="S05000")),
+    ("name prefix", dict(item_name_prefix="3 FOLD B")),
+    ("price range", dict(min_price=1000, max_price=1005)),
+    ("added between", dict(added_from="2024-03-01", added_to="2024-03-02")),
+    ("price + added", dict(min_price=1000, max_price=1010, added_from="2024-03-01", added_to="2024-03-31")),
+    ("name + price", dict(item_name="3 FOLD BLACK", min_price=1000, max_price=1100)),
+    ("code prefix + price", dict(item_code_prefix="10050", min_price=1000, max_price=1100)),
+    ("name prefix + added", dict(item_name_prefix="BABY", added_from="2024-01-01", added_to="2024-01-31")),
+)
+CHECKOUT_BILLS = 2000
+STRESS_TILLS = 4
+STRESS_BILLS_PER_TILL = 1000
+# Price edits per till in the concurrent editing stress test
+STRESS_EDITS_PER_TILL = 200
+IMPORT_ROWS = 1000000
+# HTTP API load test: catalog size, open client connections, seconds of
+# load and the lookup rate the single-core server must sustain
+API_ITEMS = 100000
+API_CONNECTIONS = 16
+API_SECONDS = 5
+API_MIN_LOOKUPS = 2000
+# Bills spread over REPORT_DAYS for the report benchmark
+REPORT_BILLS = 50000
+REPORT_DAYS = 365
+# Price history: product codes and price changes per code
+PRICE_CODES = 10000
+PRICE_CHANGES = 100
+# Journal sizes at which the stock lookup is timed
+STOCK_HISTORY = (1000, 10000, 100000, 500000)
+SUITE_SIZES = (1000, 100000, 1000000)
+SUITE_SEED = 42
+SUITE_REPEAT = 20
+# Rows a treeview window renders after each load or search
+WINDOW_ROWS = 30
+# A suite operation regresses when its median grows by this factor and by
+# more than REGRESSION_FLOOR_MS, so sub-millisecond noise is not flagged
+REGRESSION_RATIO = 1.25
+REGRESSION_FLOOR_MS = 0.5
+NAVIGATIONS = 3000
+# Allowed RSS growth over NAVIGATIONS screen switches once screens are built
+NAVIGATION_RSS_SLACK_KB = 4096
+# Warm starts timed after the first, cold one
+STARTUP_RUNS = 5
+# Seconds a --startup-time run may take before it counts as hung
+STARTUP_TIMEOUT = 60
+
+
+def make_database(path):
+    """Create a database file with a small synthetic catalog"""
+    db = Database(path)
+    db.migrate()
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO items (item_code, product_code, item_name, selling_price, date_added) VALUES (?, ?, ?, ?, ?)",
+            ((f"{100000000 + i}", f"S{i:06d}", f"ITEM {i}", 100.0 + i, '2025-05-07 17:54:30') for i in range(ITEM_COUNT))
+        )
+    db.close()
+
+
+def time_per_call(func, repeat=REPEAT):
+    """Return the mean latency of func() in microseconds"""
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def connect_per_call(path):
+    """The original pattern: open, query and close on every click"""
+    def login(i):
+        conn = sqlite3.connect(path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE username=? AND password=?", ('admin', 'admin123'))
+        cursor.fetchone()
+        conn.close()
+
+    def lookup(i):
+        conn = sqlite3.connect(path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM items WHERE product_code=?", (f"S{i % ITEM_COUNT:06d}",))
+        cursor.fetchone()
+        conn.close()
+
+    def update(i):
+        conn = sqlite3.connect(path)
+        cursor = conn.cursor()
+        cursor.execute("UPDATE items SET selling_price=? WHERE id=?", (100.0 + i, i % ITEM_COUNT + 1))
+        conn.commit()
+        conn.close()
+
+    return {"login": login, "lookup": lookup, "update": update}
+
+
+def shared_connection(db):
+    """The connection manager: one connection, cached statements, WAL"""
+    def login(i):
+        db.query_one("SELECT * FROM users WHERE username=? AND password=?", ('admin', 'admin123'))
+
+    def lookup(i):
+        db.query_one("SELECT * FROM items WHERE product_code=?", (f"S{i % ITEM_COUNT:06d}",))
+
+    def update(i):
+        with db.transaction() as cursor:
+            cursor.execute("UPDATE items SET selling_price=? WHERE id=?", (100.0 + i, i % ITEM_COUNT + 1))
+
+    return {"login": login, "lookup": lookup, "update": update}
+
+
+def synthetic_items(count, seed=1, categorized=0.8):
+    """Yield seeded item rows distributed over the shipped categories
+
+    Each category gets items in proportion to the names it lists. A
+    categorized share of the rows use a category name exactly, so they file
+    under it; the rest are numbered variants that belong to no category.
+    """
+    rng = random.Random(seed)
+    names = [name for names in DEFAULT_CATEGORIES.values() for name in names]
+    for i in range(count):
+        name = rng.choice(names)
+        if rng.random() >= categorized:
+            name = f"{name} {rng.randrange(1000)}"
+        yield (f"{100000000 + i}", f"S{i:07d}", name, float(rng.randrange(100, 5000)), '2025-05-07 17:54:30')
+
+
+def bench_connection():
+    """Connect-per-call versus the shared connection manager"""
+    with tempfile.TemporaryDirectory() as tmp:
+        before_path = os.path.join(tmp, 'before.db')
+        after_path = os.path.join(tmp, 'after.db')
+        make_database(before_path)
+        make_database(after_path)
+
+        before = {name: time_per_call(func) for name, func in connect_per_call(before_path).items()}
+
+        db = Database(after_path)
+        after = {name: time_per_call(func) for name, func in shared_connection(db).items()}
+        db.close()
+
+    print(f"{'operation':<12}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for name in before:
+        print(f"{name:<12}{before[name]:>14.1f}{after[name]:>14.1f}{before[name] / after[name]:>9.1f}x")
+
+
+def bench_search():
+    """Search-as-you-type latency over the FTS5 index on a large catalog"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'search.db'))
+        db.migrate()
+        start = time.perf_counter()
+        import_items(db, synthetic_items(SEARCH_ITEM_COUNT))
+        print(f"loaded {SEARCH_ITEM_COUNT} items with FTS triggers in {time.perf_counter() - start:.1f}s")
+
+        # What a cashier types, one keystroke at a time
+        typed = ["s", "s00", "s0012", "s001234", "1004", "100412", "gar", "garden um", "garden umbrella 12",
+                 "muthu yel", "pirikara brown 7", "telescope"]
+        print(f"{'query':<22}{'matches':>10}{'ms':>10}")
+        for text in typed:
+            tokens = search_tokens(text)
+            start = time.perf_counter()
+            for i in range(20):
+                keys = text_search(db, tokens, SEARCH_LIMIT)
+            elapsed = (time.perf_counter() - start) / 20 * 1000
+            print(f"{text:<22}{len(keys):>10}{elapsed:>10.2f}")
+        db.close()
+
+
+def bench_filters():
+    """Range, prefix and compound search_items filters seek an index on a large catalog"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'filters.db'))
+        db.migrate()
+        rng = random.Random(3)
+        first_day = datetime(2020, 1, 1)
+        # Spread date_added over six years so the date filters have something to select
+        start = time.perf_counter()
+        import_items(db, (row[:4] + ((first_day + timedelta(minutes=rng.randrange(6 * 365 * 1440)))
+                                     .strftime("%Y-%m-%d %H:%M:%S"),)
+                          for row in synthetic_items(FILTER_ITEM_COUNT)))
+        print(f"loaded {FILTER_ITEM_COUNT} items in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'filters':<22}{'rows':>6}{'ms':>9}  plan")
+        for label, filters in FILTER_CASES:
+            plan = inventory_core.explain_search(db, limit=SEARCH_LIMIT, **filters)
+            assert not any(line.startswith("SCAN") for line in plan), f"{label} scans: {plan}"
+            timing = measure(lambda: inventory_core.search_items(db, limit=SEARCH_LIMIT, **filters), 5)
+            rows = len(inventory_core.search_items(db, limit=SEARCH_LIMIT, **filters))
+            print(f"{label:<22}{rows:>6}{timing['median_ms']:>9.2f}  {' | '.join(plan)}")
+        db.close()
+
+
+def bench_checkout():
+    """Bills finalized per second through the sales ledger"""
+    with tempfile.TemporaryDirectory() as tmp:
+        make_database(os.path.join(tmp, 'checkout.db'))
+        db = Database(os.path.join(tmp, 'checkout.db'))
+        rows = db.query_all("SELECT id, item_code, product_code, item_name, selling_price FROM items")
+        rng = random.Random(1)
+
+        receipts = []
+        for i in range(CHECKOUT_BILLS):
+            receipt = Receipt()
+            for row in rng.sample(rows, rng.randrange(1, 10)):
+                receipt.add(row, rng.randrange(1, 4))
+            receipts.append(receipt)
+
+        start = time.perf_counter()
+        for receipt in receipts:
+            record_sale(db, receipt)
+        elapsed = time.perf_counter() - start
+        lines = db.query_one("SELECT COUNT(*) FROM sale_lines")[0]
+        print(f"{CHECKOUT_BILLS} bills ({lines} lines) in {elapsed:.2f}s: {CHECKOUT_BILLS / elapsed:.0f} bills/s")
+        db.close()
+
+
+def _run_till(func, till, *args):
+    """Pool entry point: (till, func(*args), None), or (till, None, traceback) if it failed"""
+    try:
+        return till, func(*args), None
+    except Exception:
+        return till, None, traceback.format_exc()
+
+
+def run_tills(func, *args):
+    """Run func(*args) in STRESS_TILLS processes at once and return their results
+
+    Every till runs to the end; the ones that failed are reported with
+    their own traceback before the run is failed as a whole.
+    """
+    with multiprocessing.Pool(STRESS_TILLS) as pool:
+        outcomes = pool.starmap(_run_till, [(func, till) + args for till in range(STRESS_TILLS)])
+    failed = [(till, error) for till, result, error in outcomes if error is not None]
+    for till, error in failed:
+        print(f"till {till} failed:\n{error}", file=sys.stderr)
+    assert not failed, f"{len(failed)} of {STRESS_TILLS} tills failed"
+    return [result for till, result, error in outcomes]
+
+
+def _till_worker(path, bills):
+    """Finalize bills as fast as possible; returns the bill numbers issued"""
+    db = Database(path)
+    try:
+        rows = db.query_all("SELECT id, item_code, product_code, item_name, selling_price FROM items LIMIT 50")
+        issued = []
+        for i in range(bills):
+            receipt = Receipt()
+            receipt.add(rows[i % len(rows)])
+            issued.append(record_sale(db, receipt))
+        return issued
+    finally:
+        db.close()
+
+
+def bench_bills():
+    """Several processes finalizing bills in a tight loop: none lost, none shared"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bills.db')
+        make_database(path)
+
+        start = time.perf_counter()
+        results = run_tills(_till_worker, path, STRESS_BILLS_PER_TILL)
+        elapsed = time.perf_counter() - start
+
+        expected = STRESS_TILLS * STRESS_BILLS_PER_TILL
+        issued = [bill for till in results for bill in till]
+        db = Database(path)
+        stored = db.query_all("SELECT id, bill_no FROM sales ORDER BY id")
+        sold = db.query_one("SELECT SUM(quantity) FROM sale_lines")[0]
+        stocked = db.query_one("SELECT SUM(on_hand) FROM stock")[0]
+        drift = rebuild_balances(db)
+        db.close()
+
+        assert len(issued) == expected, "a till lost a bill"
+        assert len({bill_no for sale_id, bill_no in issued}) == expected, "two bills share a number"
+        assert sorted(issued) == stored, "issued bills differ from the ledger"
+        assert stocked == -sold, "stock balances differ from the quantities sold"
+        assert drift == 0, "stock balances differ from the movement journal"
+        for till in results:
+            ids = [sale_id for sale_id, bill_no in till]
+            assert ids == sorted(ids), "bill numbers went backwards within a till"
+        print(f"{STRESS_TILLS} tills x {STRESS_BILLS_PER_TILL} bills in {elapsed:.2f}s: "
+              f"{expected} unique, monotonic bill numbers, none lost")
+
+
+def _till_editor(path, item_code, edits, optimistic):
+    """Raise an item's price by 1 edits times from a fresh read each time
+
+    With optimistic=True the edit carries the version it read and is
+    retried on ConflictError; without, it blindly writes what it computed.
+    Also receives one unit per edit and races the other tills to add the
+    same product code. Returns (conflicts, busy retries, added).
+    """
+    db = Database(path)
+    try:
+        conflicts = 0
+        for i in range(edits):
+            while True:
+                row = inventory_core.search_items(db, item_code=item_code)[0]
+                try:
+                    inventory_core.update_item(db, row[0], row[1], row[2], row[3], row[4] + 1,
+                                               row[6] if optimistic else None)
+                    break
+                except inventory_core.ConflictError:
+                    conflicts += 1
+            inventory_core.receive_stock(db, row[2], 1)
+        try:
+            inventory_core.add_item(db, "RACE", "RACE-1", "RACE ITEM", 1)
+            added = 1
+        except ValueError:
+            added = 0
+    finally:
+        db.close()
+    retries = METRICS.snapshot().get("sql:busy retry", {}).get("count", 0)
+    return conflicts, retries, added
+
+
+def bench_tills():
+    """Several processes editing the same item: no lost price updates or stock receipts"""
+    edits = STRESS_TILLS * STRESS_EDITS_PER_TILL
+    for optimistic in (True, False):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tills.db')
+            make_database(path)
+            db = Database(path)
+            item_id, item_code, product_code, price, version = db.query_one(
+                "SELECT id, item_code, product_code, selling_price, version FROM items ORDER BY id LIMIT 1")
+            db.close()
+
+            start = time.perf_counter()
+            results = run_tills(_till_editor, path, item_code, STRESS_EDITS_PER_TILL, optimistic)
+            elapsed = time.perf_counter() - start
+
+            db = Database(path)
+            final_price, final_version = db.query_one("SELECT selling_price, version FROM items WHERE id=?",
+                                                      (item_id,))
+            received = on_hand(db, item_id)
+            racers = db.query_one("SELECT COUNT(*) FROM items WHERE product_code='RACE-1'")[0]
+            db.close()
+
+        lost = edits - round(final_price - price)
+        conflicts = sum(result[0] for result in results)
+        retries = sum(result[1] for result in results)
+        label = "versioned" if optimistic else "unversioned"
+        print(f"{label:<12}{STRESS_TILLS} tills x {STRESS_EDITS_PER_TILL} edits in {elapsed:.2f}s: "
+              f"{lost} lost, {conflicts} conflicts retried, {retries} busy retries")
+        assert received == edits, "a stock receipt was lost"
+        assert final_version == version + edits, "an update did not bump the row version"
+        assert sum(result[2] for result in results) == racers == 1, "a product code was added twice"
+        if optimistic:
+            assert lost == 0, "a price update was lost"
+
+
+def bench_reports():
+    """A month of category, item and daily totals from the rollups versus the raw ledger"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'reports.db')
+        db = Database(path)
+        db.migrate()
+        import_items(db, synthetic_items(ITEM_COUNT))
+        rows = db.query_all("SELECT id, item_code, product_code, item_name, selling_price FROM items")
+        rng = random.Random(1)
+        first_day = datetime(2025, 1, 1, 9)
+        start = time.perf_counter()
+        for i in range(REPORT_BILLS):
+            receipt = Receipt()
+            for row in rng.sample(rows, rng.randrange(1, 6)):
+                receipt.add(row, rng.randrange(1, 4))
+            record_sale(db, receipt, first_day + timedelta(days=i * REPORT_DAYS // REPORT_BILLS, seconds=i % 30000))
+        elapsed = time.perf_counter() - start
+        print(f"{REPORT_BILLS} bills over {REPORT_DAYS} days recorded with rollups: {REPORT_BILLS / elapsed:.0f} bills/s")
+
+        begin, end = "2025-06-01", "2025-06-30"
+        raw = {
+            "daily": ("SELECT substr(sold_at, 1, 10) AS day, COUNT(*), SUM(item_count), SUM(subtotal_cents), "
+                      "SUM(tax_cents), SUM(total_cents) FROM sales WHERE sold_at >= ? AND sold_at < ? "
+                      "GROUP BY day ORDER BY day"),
+            "items": ("SELECT l.product_code, MAX(l.item_code), MAX(l.item_name), SUM(l.quantity), "
+                      "SUM(l.unit_price_cents * l.quantity) AS revenue FROM sale_lines l JOIN sales s ON s.id = l.sale_id "
+                      "WHERE s.sold_at >= ? AND s.sold_at < ? GROUP BY l.product_code "
+                      "ORDER BY revenue DESC, l.product_code"),
+            "categories": ("SELECT COALESCE(c.name, ''), SUM(l.quantity), SUM(l.unit_price_cents * l.quantity) AS revenue "
+                           "FROM sale_lines l JOIN sales s ON s.id = l.sale_id "
+                           "LEFT JOIN category_items ci ON ci.item_name = l.item_name "
+                           "LEFT JOIN categories c ON c.id = ci.category_id WHERE s.sold_at >= ? AND s.sold_at < ? "
+                           "GROUP BY 1 ORDER BY revenue DESC, 1"),
+        }
+        rollup = {"daily": daily_revenue, "items": item_totals, "categories": category_totals}
+        print(f"{'report':<12}{'rows':>8}{'rollup ms':>12}{'raw scan ms':>14}")
+        for name, sql in raw.items():
+            fast = measure(lambda: rollup[name](db, begin, end), SUITE_REPEAT)
+            slow = measure(lambda: db.query_all(sql, (begin, "2025-07-01")), SUITE_REPEAT)
+            result = rollup[name](db, begin, end)
+            assert result == db.query_all(sql, (begin, "2025-07-01")), f"{name} rollup differs from the ledger"
+            print(f"{name:<12}{len(result):>8}{fast['median_ms']:>12.2f}{slow['median_ms']:>14.2f}")
+
+        incremental = {table: db.query_all(f"SELECT * FROM {table} ORDER BY 1, 2") for table in ROLLUP_TABLES}
+        start = time.perf_counter()
+        days = rebuild_rollups(db)
+        print(f"rebuild of {days} days in {time.perf_counter() - start:.2f}s")
+        for table in ROLLUP_TABLES:
+            assert db.query_all(f"SELECT * FROM {table} ORDER BY 1, 2") == incremental[table], \
+                f"{table} differs after a rebuild"
+        db.close()
+
+
+def bench_prices():
+    """As-of price lookups against a long history versus scanning it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'prices.db'))
+        db.migrate()
+        rng = random.Random(1)
+        first_day = datetime(2020, 1, 1)
+        # Each code changes price PRICE_CHANGES times at random moments over five years
+        with db.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO price_history (product_code, selling_price, valid_from) VALUES (?, ?, ?)",
+                ((f"S{code:07d}", float(rng.randrange(100, 5000)),
+                  (first_day + timedelta(minutes=rng.randrange(5 * 365 * 1440))).strftime("%Y-%m-%d %H:%M:%S"))
+                 for code in range(PRICE_CODES) for change in range(PRICE_CHANGES))
+            )
+        history = db.query_one("SELECT COUNT(*) FROM price_history")[0]
+        when = datetime(2023, 6, 30, 12)
+        codes = [f"S{rng.randrange(PRICE_CODES):07d}" for i in range(REPEAT)]
+
+        start = time.perf_counter()
+        for code in codes:
+            price_at(db, code, when)
+        lookup = (time.perf_counter() - start) / REPEAT * 1e6
+
+        # Latest row per code at or before when, found by reading the whole history
+        scan_sql = ("SELECT product_code, selling_price FROM (SELECT product_code, selling_price, ROW_NUMBER() OVER "
+                    "(PARTITION BY product_code ORDER BY valid_from DESC, id DESC) AS n FROM price_history "
+                    "WHERE valid_from <= ?) WHERE n = 1 AND selling_price IS NOT NULL ORDER BY product_code")
+        fast = measure(lambda: price_list_at(db, when), 5)
+        slow = measure(lambda: db.query_all(scan_sql, (when.strftime("%Y-%m-%d %H:%M:%S"),)), 5)
+        assert price_list_at(db, when) == db.query_all(scan_sql, (when.strftime("%Y-%m-%d %H:%M:%S"),)), \
+            "as-of price list differs from a scan of the history"
+        print(f"{history} history rows for {PRICE_CODES} product codes")
+        print(f"price_at:       {lookup:.1f} us")
+        print(f"price_list_at:  {fast['median_ms']:.1f} ms (full history scan: {slow['median_ms']:.1f} ms)")
+        db.close()
+
+
+def bench_stock():
+    """On-hand lookups stay flat as the movement journal grows"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stock.db')
+        make_database(path)
+        db = Database(path)
+        item_ids = [row[0] for row in db.query_all("SELECT id FROM items")]
+        rng = random.Random(1)
+        print(f"{'movements':>10}{'insert/s':>12}{'lookup (us)':>14}")
+        journaled = 0
+        for size in STOCK_HISTORY:
+            batch = [(rng.choice(item_ids), rng.choice((-2, -1, 1, 5))) for i in range(size - journaled)]
+            start = time.perf_counter()
+            with db.transaction() as cursor:
+                cursor.executemany(
+                    "INSERT INTO stock_movements (item_id, kind, quantity, moved_at) "
+                    "VALUES (?, 'adjustment', ?, '2025-01-01 00:00:00')", batch
+                )
+            insert_rate = len(batch) / (time.perf_counter() - start)
+            journaled = size
+
+            start = time.perf_counter()
+            for i in range(REPEAT):
+                on_hand(db, item_ids[i % len(item_ids)])
+            lookup = (time.perf_counter() - start) / REPEAT * 1e6
+            print(f"{size:>10}{insert_rate:>12.0f}{lookup:>14.1f}")
+        assert rebuild_balances(db) == 0, "stock balances differ from the movement journal"
+        db.close()
+
+
+def bench_import():
+    """Streaming CSV import of a large price list, then a re-import and an export"""
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'prices.csv')
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(("item_code", "product_code", "item_name", "selling_price"))
+            writer.writerows(row[:4] for row in synthetic_items(IMPORT_ROWS))
+        print(f"price list: {IMPORT_ROWS} rows, {os.path.getsize(csv_path) / 1e6:.0f} MB")
+
+        db = Database(os.path.join(tmp, 'import.db'))
+        db.migrate()
+        start = time.perf_counter()
+        count = import_file(db, csv_path)
+        elapsed = time.perf_counter() - start
+        print(f"import:    {count} rows in {elapsed:.1f}s: {count / elapsed:.0f} rows/s")
+
+        # Same file again under tracemalloc: every row hits the upsert's
+        # conflict path, and the Python heap must not grow with the file
+        heap = []
+        tracemalloc.start()
+        start = time.perf_counter()
+        import_file(db, csv_path, lambda count: heap.append(tracemalloc.get_traced_memory()[1]))
+        elapsed = time.perf_counter() - start
+        tracemalloc.stop()
+        print(f"re-import: {count} unchanged rows in {elapsed:.1f}s (traced), Python heap peak "
+              f"{heap[len(heap) // 2] / 1e6:.1f} MB halfway, {heap[-1] / 1e6:.1f} MB at the end")
+
+        start = time.perf_counter()
+        count = export_file(db, os.path.join(tmp, 'export.csv'))
+        print(f"export:    {count} rows in {time.perf_counter() - start:.1f}s")
+        db.close()
+
+
+def widget_count(widget):
+    """Number of Tk widgets in a tree, the widget itself included"""
+    return 1 + sum(widget_count(child) for child in widget.winfo_children())
+
+
+def current_rss_kb():
+    """Resident set size right now, or None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return None
+
+
+async def _api_client(port, codes, deadline, latencies):
+    """Look up random product codes over one keep-alive connection until deadline"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    rng = random.Random(port + len(latencies))
+    errors = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        writer.write(f"GET /items/{rng.choice(codes)} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        status = await reader.readline()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+        errors += not status.startswith(b"HTTP/1.1 200")
+    writer.close()
+    return errors
+
+
+async def _api_load(port, codes):
+    latencies = []
+    deadline = time.perf_counter() + API_SECONDS
+    errors = await asyncio.gather(*(_api_client(port, codes, deadline, latencies) for i in range(API_CONNECTIONS)))
+    return latencies, sum(errors)
+
+
+def bench_api():
+    """Lookups per second through the HTTP API, with the server held to one core"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'api.db')
+        db = Database(path)
+        db.migrate()
+        import_items(db, synthetic_items(API_ITEMS))
+        db.close()
+
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inventory_api.py")
+        pin = (lambda: os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})) \
+            if hasattr(os, "sched_setaffinity") else None
+        server = subprocess.Popen([sys.executable, script, "--port", "0", "--db", path],
+                                  stdout=subprocess.PIPE, text=True, preexec_fn=pin)
+        try:
+            port = int(server.stdout.readline().rsplit(":", 1)[1])
+            codes = [f"S{i:07d}" for i in range(API_ITEMS)]
+            latencies, errors = asyncio.run(_api_load(port, codes))
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    rate = len(latencies) / API_SECONDS
+    print(f"{len(latencies)} lookups over {API_CONNECTIONS} connections in {API_SECONDS}s: {rate:.0f}/s, "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    assert errors == 0, f"{errors} lookups failed"
+    assert rate >= API_MIN_LOOKUPS, f"server sustained {rate:.0f} lookups/s, below {API_MIN_LOOKUPS}"
+
+
+def bench_navigation():
+    """Thousands of screen switches: the widget count and RSS must stay flat"""
+    import tkinter as tk
+    from inventory_system import InventoryManagementSystem
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"skipped, no display: {e}")
+        return
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # The application opens inventory.db in the working directory
+        os.chdir(tmp)
+        try:
+            app = InventoryManagementSystem(root)
+            # Visit every screen once so all of them are built
+            app.show_main_frame()
+            app.show_item_frame()
+            root.update()
+
+            samples = [(0, widget_count(root), current_rss_kb())]
+            start = time.perf_counter()
+            for i in range(1, NAVIGATIONS + 1):
+                if i % 2:
+                    app.show_main_frame()
+                else:
+                    app.show_item_frame()
+                if i % 100 == 0:
+                    root.update()
+                if i % 500 == 0:
+                    samples.append((i, widget_count(root), current_rss_kb()))
+            elapsed = time.perf_counter() - start
+            app.worker.stop()
+        finally:
+            root.destroy()
+            os.chdir(cwd)
+
+    print(f"{'navigations':>12}{'widgets':>10}{'rss (KB)':>12}")
+    for i, widgets, rss in samples:
+        print(f"{i:>12}{widgets:>10}{rss if rss is not None else 'n/a':>12}")
+    print(f"{NAVIGATIONS} navigations in {elapsed:.2f}s: {elapsed / NAVIGATIONS * 1000:.2f} ms each")
+    assert len({widgets for i, widgets, rss in samples}) == 1, "widget count grew with navigation"
+    if samples[0][2] is not None:
+        growth = samples[-1][2] - samples[0][2]
+        assert growth < NAVIGATION_RSS_SLACK_KB, f"RSS grew by {growth} KB"
+
+
+def bench_startup():
+    """Process start to first paint and to a usable login screen, cold and warm"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inventory_system.py")
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # The first run creates and migrates inventory.db, the later ones reopen it
+        for i in range(STARTUP_RUNS + 1):
+            start = time.perf_counter()
+            try:
+                result = subprocess.run([sys.executable, script, "--startup-time"], cwd=tmp,
+                                        capture_output=True, text=True, timeout=STARTUP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                raise AssertionError(f"the application was not interactive after {STARTUP_TIMEOUT}s") from None
+            wall = (time.perf_counter() - start) * 1000
+            if result.returncode != 0:
+                print(f"skipped, the application did not start: {result.stderr.strip().splitlines()[-1:]}")
+                return
+            timings = json.loads(result.stdout.strip().splitlines()[-1])
+            runs.append((timings["startup:first_paint"], timings["startup:interactive"], wall))
+
+    print(f"{'run':>6}{'first paint':>14}{'interactive':>14}{'process':>12}")
+    for i, (first_paint, interactive, wall) in enumerate(runs):
+        print(f"{'cold' if i == 0 else 'warm':>6}{first_paint:>11.1f} ms{interactive:>11.1f} ms{wall:>9.1f} ms")
+    warm = runs[1:]
+    print(f"warm median: first paint {statistics.median(r[0] for r in warm):.1f} ms, "
+          f"interactive {statistics.median(r[1] for r in warm):.1f} ms")
+
+
+def measure(func, repeat):
+    """Run func() repeat times and summarize the wall-clock milliseconds"""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "max_ms": max(times), "runs": repeat}
+
+
+def first_window(view):
+    """Read the rows a treeview shows right after set_source()"""
+    key = view.key_at(0)
+    return view.rows_from(key, WINDOW_ROWS) if key is not None else []
+
+
+def suite_operations(path, count, seed, tmp):
+    """Time the headless work behind each GUI handler on one catalog
+
+    The repeat count shrinks with the catalog so a 1M-row run stays within
+    minutes; every operation still runs at least three times.
+    """
+    repeat = max(3, min(SUITE_REPEAT, 100000 // count))
+    rng = random.Random(seed)
+    results = {}
+
+    # create_database plus the categories query, as at application start
+    def startup():
+        db = Database(path)
+        db.migrate()
+        load_categories(db)
+        db.close()
+    results["startup"] = measure(startup, repeat)
+
+    db = Database(path)
+    cache = CatalogCache(load_categories(db))
+
+    # Worker fetch, cache rebuild and the first treeview window
+    def load_items():
+        cache.load(fetch_items(db))
+        first_window(CatalogView(cache))
+    results["load_items"] = measure(load_items, repeat)
+
+    rows = [cache.rows[key] for key in rng.sample(cache.keys, min(len(cache.keys), 200))]
+    searches = [(f"search_items[{field}]", {field: rows[i][index]})
+                for i, (field, index) in enumerate((("item_code", 1), ("product_code", 2), ("item_name", 3),
+                                                    ("selling_price", 4)))]
+    for name, filters in searches:
+        results[name] = measure(lambda: first_window(search_view(cache, **filters)), repeat)
+
+    def update_item_dropdowns():
+        for category in cache.categories:
+            cache.category_dropdowns(category)
+            first_window(category_view(cache, category))
+    results["update_item_dropdowns"] = measure(update_item_dropdowns, repeat)
+
+    # Twenty selected rows added to a fresh receipt
+    def add_to_cart():
+        receipt = Receipt()
+        for row in rows[:20]:
+            receipt.add(row)
+    results["add_to_cart"] = measure(add_to_cart, SUITE_REPEAT)
+
+    # Ledger write, bill text and bill file for a five-line receipt
+    def print_bill():
+        receipt = Receipt()
+        for row in rng.sample(rows, 5):
+            receipt.add(row, rng.randrange(1, 4))
+        sold_at = datetime.now()
+        sale_id, bill_no = record_sale(db, receipt, sold_at)
+        with open(os.path.join(tmp, f"bill_{bill_no}.txt"), "w") as f:
+            f.write(format_bill(receipt, bill_no, sold_at))
+    results["print_bill"] = measure(print_bill, SUITE_REPEAT)
+    db.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_results(baseline, current):
+    """Print per-operation ratios against a saved run; returns the regressions"""
+    regressions = []
+    print(f"{'size':>9}  {'operation':<28}{'before':>10}{'after':>10}{'ratio':>8}")
+    for size, operations in current["results"].items():
+        for name, result in operations.items():
+            before = baseline["results"].get(size, {}).get(name)
+            if before is None:
+                continue
+            ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+            regressed = (ratio > REGRESSION_RATIO
+                         and result["median_ms"] - before["median_ms"] > REGRESSION_FLOOR_MS)
+            if regressed:
+                regressions.append((size, name, ratio))
+            print(f"{size:>9}  {name:<28}{before['median_ms']:>10.2f}{result['median_ms']:>10.2f}"
+                  f"{ratio:>7.2f}x{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def bench_suite(sizes=SUITE_SIZES, seed=SUITE_SEED, json_path=None, baseline_path=None):
+    """Seeded 1k/100k/1M catalogs timed through every GUI handler's data path"""
+    document = {
+        "revision": git_revision(),
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in sizes:
+            path = os.path.join(tmp, f"catalog_{count}.db")
+            start = time.perf_counter()
+            db = Database(path)
+            db.migrate()
+            import_items(db, synthetic_items(count, seed))
+            db.close()
+            print(f"-- {count} items (built in {time.perf_counter() - start:.1f}s)")
+
+            results = suite_operations(path, count, seed, tmp)
+            print(f"{'operation':<28}{'median ms':>12}{'min ms':>10}{'runs':>6}")
+            for name, result in results.items():
+                print(f"{name:<28}{result['median_ms']:>12.3f}{result['min_ms']:>10.3f}{result['runs']:>6}")
+            document["results"][str(count)] = results
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"results written to {json_path}")
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        print(f"-- compared with {baseline_path} (revision {baseline.get('revision')})")
+        regressions = compare_results(baseline, document)
+        if regressions:
+            print(f"{len(regressions)} operation(s) regressed by more than {REGRESSION_RATIO:.2f}x")
+            return 1
+    return 0
+
+
+BENCHMARKS = {
+    "connection": bench_connection,
+    "search": bench_search,
+    "filters": bench_filters,
+    "checkout": bench_checkout,
+    "bills": bench_bills,
+    "tills": bench_tills,
+    "stock": bench_stock,
+    "reports": bench_reports,
+    "prices": bench_prices,
+    "import": bench_import,
+    "api": bench_api,
+    "navigation": bench_navigation,
+    "startup": bench_startup,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the inventory application")
+    parser.add_argument("names", nargs="*", metavar="name", help=f"any of {', '.join(BENCHMARKS)}, suite")
+    parser.add_argument("--sizes", nargs="+", type=int, default=SUITE_SIZES, help="suite catalog sizes")
+    parser.add_argument("--seed", type=int, default=SUITE_SEED, help="suite data generator seed")
+    parser.add_argument("--json", help="write suite results to this file")
+    parser.add_argument("--compare", help="suite results from an earlier run to check for regressions")
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name != "suite" and name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}")
+
+    status = 0
+    for name in args.names or BENCHMARKS:
+        print(f"== {name}")
+        if name == "suite":
+            status = bench_suite(args.sizes, args.seed, args.json, args.compare) or status
+        else:
+            BENCHMARKS[name]()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+import re
+from bisect import bisect_left, bisect_right, insort
+
+from database import ITEM_COLUMNS
+
+# Positions inside an items row tuple
+ID, ITEM_CODE, PRODUCT_CODE, ITEM_NAME, SELLING_PRICE, DATE_ADDED = range(6)
+
+# Word characters as FTS5's unicode61 tokenizer sees them
+TOKEN_RE = re.compile(r"\w+")
+
+
+def search_tokens(text):
+    """Split search box text into lower-case tokens"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def fts_query(tokens):
+    """Build an FTS5 MATCH expression requiring a prefix match for every token"""
+    return " ".join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+
+def text_matches(row, tokens):
+    """Python equivalent of the FTS query, used to place changed rows"""
+    words = search_tokens(f"{row[ITEM_NAME]} {row[ITEM_CODE]} {row[PRODUCT_CODE]}")
+    return all(any(word.startswith(token) for word in words) for token in tokens)
+
+
+def fetch_items(db):
+    """Read every items row in id order, ready for CatalogCache.load"""
+    return db.query_all(f"SELECT {ITEM_COLUMNS} FROM items ORDER BY id")
+
+
+def text_search(db, tokens, limit=-1):
+    """Ids of rows whose name or codes contain a word starting with every token
+
+    FTS5 walks its doclists in rowid order, so a limit stops the query
+    after the first matches instead of collecting every hit of a short prefix.
+    No tokens match nothing; FTS5 rejects an empty MATCH.
+    """
+    if not tokens:
+        return []
+    return [key for (key,) in db.query_all(
+        "SELECT rowid FROM items_fts WHERE items_fts MATCH ? ORDER BY rowid LIMIT ?", (fts_query(tokens), limit))]
+
+
+def load_categories(db):
+    """Return {category: [item names]} in display order with a single query"""
+    categories = {}
+    for category, item_name in db.query_all('''
+        SELECT c.name, ci.item_name FROM categories c
+        LEFT JOIN category_items ci ON ci.category_id = c.id
+        ORDER BY c.position, c.id, ci.position
+    '''):
+        names = categories.setdefault(category, [])
+        if item_name is not None:
+            names.append(item_name)
+    return categories
+
+
+def assign_category(db, item_name, category):
+    """File an item name under a category, creating the category if needed"""
+    item_name, category = str(item_name).strip(), str(category).strip()
+    if not (item_name and category):
+        raise ValueError("Item name and category are required")
+    with db.transaction(immediate=True) as cursor:
+        cursor.execute("INSERT OR IGNORE INTO categories (name, position) "
+                       "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM categories))", (category,))
+        category_id = cursor.execute("SELECT id FROM categories WHERE name=?", (category,)).fetchone()[0]
+        cursor.execute("INSERT OR IGNORE INTO category_items (category_id, item_name, position) "
+                       "VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM category_items WHERE category_id=?))",
+                       (category_id, item_name, category_id))
+
+
+class CatalogCache:
+    """In-memory copy of the items table with secondary indexes
+
+    The cache is write-through: the application commits to SQLite first and
+    then calls put()/remove() with the committed row. Every mutation bumps
+    generation, so views built from the cache can tell when they are stale.
+    The cache never queries the database itself; load() takes the rows from
+    fetch_items() so the read can happen on another thread. build_catalog()
+    does both on the worker and adopt() swaps the result in.
+    """
+
+    def __init__(self, categories):
+        self.generation = 0
+        self.rows = {}
+        self.keys = []
+        self.by_product_code = {}
+        self.by_item_code = {}
+        self.by_item_name = {}
+        self.by_category = {}
+        self.set_categories(categories)
+
+    def set_categories(self, categories):
+        """Map item names to their categories and rebuild the indexes"""
+        self.categories = categories
+        self.name_categories = {}
+        for category, names in categories.items():
+            for name in names:
+                self.name_categories.setdefault(name, set()).add(category)
+        self.load(list(self.rows.values()))
+
+    def load(self, rows):
+        """Replace the cached catalog with rows and rebuild every index"""
+        self.rows = {}
+        self.by_product_code = {}
+        self.by_item_code = {}
+        self.by_item_name = {}
+        self.by_category = {category: set() for category in self.categories}
+        for row in rows:
+            self.rows[row[ID]] = row
+            self._index(row)
+        self.keys = list(self.rows)
+        self.generation += 1
+
+    def adopt(self, other):
+        """Take over the rows and indexes of a cache built on another thread"""
+        self.categories = other.categories
+        self.name_categories = other.name_categories
+        self.rows = other.rows
+        self.keys = other.keys
+        self.by_product_code = other.by_product_code
+        self.by_item_code = other.by_item_code
+        self.by_item_name = other.by_item_name
+        self.by_category = other.by_category
+        self.generation += 1
+
+    def _index(self, row):
+        key = row[ID]
+        self.by_product_code[row[PRODUCT_CODE]] = key
+        self.by_item_code.setdefault(row[ITEM_CODE], set()).add(key)
+        self.by_item_name.setdefault(row[ITEM_NAME], set()).add(key)
+        for category in self.name_categories.get(row[ITEM_NAME], ()):
+            self.by_category[category].add(key)
+
+    def _unindex(self, row):
+        key = row[ID]
+        self.by_product_code.pop(row[PRODUCT_CODE], None)
+        self.by_item_code[row[ITEM_CODE]].discard(key)
+        if not self.by_item_code[row[ITEM_CODE]]:
+            del self.by_item_code[row[ITEM_CODE]]
+        self.by_item_name[row[ITEM_NAME]].discard(key)
+        if not self.by_item_name[row[ITEM_NAME]]:
+            del self.by_item_name[row[ITEM_NAME]]
+        for category in self.name_categories.get(row[ITEM_NAME], ()):
+            self.by_category[category].discard(key)
+
+    def put(self, row):
+        """Insert or replace a committed row"""
+        key = row[ID]
+        old = self.rows.get(key)
+        if old is not None:
+            self._unindex(old)
+        else:
+            insort(self.keys, key)
+        self.rows[key] = row
+        self._index(row)
+        self.generation += 1
+
+    def remove(self, key):
+        """Drop a deleted row"""
+        old = self.rows.pop(key, None)
+        if old is not None:
+            self._unindex(old)
+            del self.keys[bisect_left(self.keys, key)]
+        self.generation += 1
+
+    def get(self, key):
+        return self.rows.get(key)
+
+    def find_product_code(self, product_code):
+        """Return the row with this product code or None"""
+        key = self.by_product_code.get(product_code)
+        return self.rows[key] if key is not None else None
+
+    def keys_with_item_code(self, item_code):
+        return self.by_item_code.get(item_code, set())
+
+    def keys_in_category(self, category):
+        return self.by_category.get(category, set())
+
+    def category_rows(self, category):
+        """Rows of a category in id order, from one index lookup"""
+        return [self.rows[key] for key in sorted(self.keys_in_category(category))]
+
+    def category_dropdowns(self, category):
+        """Dropdown values for a category: the first row of each of its item names
+
+        Returns (item_codes, product_codes, item_names, selling_prices) in the
+        category's display order, from one category index lookup.
+        """
+        first_by_name = {}
+        for row in self.category_rows(category):
+            first_by_name.setdefault(row[ITEM_NAME], row)
+        rows = [first_by_name[name] for name in self.categories.get(category, []) if name in first_by_name]
+        return ([row[ITEM_CODE] for row in rows], [row[PRODUCT_CODE] for row in rows],
+                [row[ITEM_NAME] for row in rows], [str(row[SELLING_PRICE]) for row in rows])
+
+    def search(self, item_code="", product_code="", item_name="", selling_price=None):
+        """Keys of rows equal to every given filter, narrowed through the indexes"""
+        if product_code:
+            key = self.by_product_code.get(product_code)
+            candidates = {key} if key is not None else set()
+        elif item_code:
+            candidates = self.by_item_code.get(item_code, set())
+        elif item_name:
+            candidates = self.by_item_name.get(item_name, set())
+        else:
+            candidates = self.keys
+        return [key for key in candidates
+                if (not item_code or self.rows[key][ITEM_CODE] == item_code)
+                and (not item_name or self.rows[key][ITEM_NAME] == item_name)
+                and (selling_price is None or self.rows[key][SELLING_PRICE] == selling_price)]
+
+
+def build_catalog(db, categories):
+    """Read the items table into a new, fully indexed CatalogCache (worker thread)"""
+    cache = CatalogCache(categories)
+    cache.load(fetch_items(db))
+    return cache
+
+
+class CatalogView:
+    """A sorted subset of the cache, served to VirtualTreeview from memory
+
+    With no keys_func the view shares the cache's own key list and always
+    covers the whole catalog. Otherwise keys_func() yields the subset and
+    predicate(row) decides whether a changed row belongs to it.
+    """
+
+    def __init__(self, cache, keys_func=None, predicate=None):
+        self.cache = cache
+        self.keys_func = keys_func
+        self.predicate = predicate
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompute the key list from the cache"""
+        if self.keys_func is None:
+            self.keys = self.cache.keys
+        else:
+            self.keys = sorted(self.keys_func())
+        self.generation = self.cache.generation
+
+    def is_stale(self):
+        """True once the cache has changed in a way this view has not seen"""
+        return self.generation != self.cache.generation
+
+    def matches(self, row):
+        return self.predicate is None or self.predicate(row)
+
+    def apply_change(self, old, new):
+        """Track one write-through change; returns (was_member, is_member)"""
+        was = old is not None and self.matches(old)
+        now = new is not None and self.matches(new)
+        if self.keys is not self.cache.keys:
+            key = (new or old)[ID]
+            if was and not now:
+                del self.keys[bisect_left(self.keys, key)]
+            elif now and not was:
+                insort(self.keys, key)
+        self.generation = self.cache.generation
+        return was, now
+
+    def count(self):
+        return len(self.keys)
+
+    def key_at(self, index):
+        return self.keys[index] if 0 <= index < len(self.keys) else None
+
+    def rows_from(self, key, limit):
+        start = bisect_left(self.keys, key)
+        return [self.cache.rows[k] for k in self.keys[start:start + limit]]
+
+    def rows_after(self, key, limit):
+        start = bisect_right(self.keys, key)
+        return [self.cache.rows[k] for k in self.keys[start:start + limit]]
+
+    def rows_before(self, key, limit):
+        end = bisect_left(self.keys, key)
+        return [self.cache.rows[k] for k in self.keys[max(0, end - limit):end]]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+
+def category_view(cache, category):
+    """View of the rows whose item name is filed under a category"""
+    return CatalogView(
+        cache,
+        lambda: cache.keys_in_category(category),
+        lambda row: category in cache.name_categories.get(row[ITEM_NAME], ())
+    )
+
+
+def search_view(cache, item_code="", product_code="", item_name="", selling_price=None):
+    """View of the rows equal to every given filter"""
+    def matches(row):
+        return ((not item_code or row[ITEM_CODE] == item_code)
+                and (not product_code or row[PRODUCT_CODE] == product_code)
+                and (not item_name or row[ITEM_NAME] == item_name)
+                and (selling_price is None or row[SELLING_PRICE] == selling_price))
+
+    return CatalogView(cache, lambda: cache.search(item_code, product_code, item_name, selling_price), matches)
@@ -0,0 +1,163 @@
+"""Bulk import and export of the item catalog as CSV
+
+Run with: python catalog_csv.py import prices.csv
+          python catalog_csv.py export catalog.csv
+"""
+import argparse
+import csv
+import sqlite3
+import sys
+from datetime import datetime
+from itertools import islice
+
+from database import DB_PATH, Database
+
+# Columns written by export_items; import_items needs the first four and
+# takes date_added when present
+CSV_FIELDS = ("item_code", "product_code", "item_name", "selling_price", "date_added")
+REQUIRED_FIELDS = CSV_FIELDS[:4]
+
+# Rows written per transaction: large enough to amortize the commit, small
+# enough that other tills never wait long for the write lock
+CHUNK_SIZE = 20000
+
+# Each chunk is first copied into a temp table and then upserted with a single
+# INSERT ... SELECT. FTS5 flushes its pending terms at every statement
+# boundary, so upserting row by row through executemany would write one
+# full-text segment per item; one statement per chunk writes one.
+STAGING_TABLE = '''
+CREATE TEMP TABLE IF NOT EXISTS import_rows (
+    item_code TEXT, product_code TEXT, item_name TEXT, selling_price REAL, date_added TEXT
+)
+'''
+
+# An existing product code keeps its id and date_added; rows whose values did
+# not change are left alone so re-importing a price list only touches the
+# prices that moved
+UPSERT_SQL = '''
+INSERT INTO items (item_code, product_code, item_name, selling_price, date_added)
+SELECT item_code, product_code, item_name, selling_price, date_added FROM temp.import_rows WHERE true ORDER BY rowid
+ON CONFLICT(product_code) DO UPDATE SET
+    item_code=excluded.item_code, item_name=excluded.item_name, selling_price=excluded.selling_price,
+    version=version + 1
+WHERE item_code IS NOT excluded.item_code OR item_name IS NOT excluded.item_name
+    OR selling_price IS NOT excluded.selling_price
+'''
+
+
+def read_items(lines):
+    """Yield items rows from CSV text one at a time
+
+    lines is an open file (or any iterable of lines) with a header row.
+    Raises ValueError naming the line of the first malformed row.
+    """
+    reader = csv.DictReader(lines)
+    missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+    has_date = "date_added" in reader.fieldnames
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for record in reader:
+        item_code = (record["item_code"] or "").strip()
+        product_code = (record["product_code"] or "").strip()
+        item_name = (record["item_name"] or "").strip()
+        price = (record["selling_price"] or "").strip()
+        if not (item_code or product_code or item_name or price):
+            continue
+        if not (item_code and product_code and item_name and price):
+            raise ValueError(f"Line {reader.line_num}: all fields are required")
+        try:
+            selling_price = float(price)
+        except ValueError:
+            raise ValueError(f"Line {reader.line_num}: selling price must be a number") from None
+        if selling_price < 0:
+            raise ValueError(f"Line {reader.line_num}: selling price cannot be negative")
+        date_added = (record["date_added"] or "").strip() if has_date else ""
+        yield item_code, product_code, item_name, selling_price, date_added or now
+
+
+def import_items(db, rows, progress=None, chunk_size=CHUNK_SIZE):
+    """Upsert items rows on product_code in chunked transactions
+
+    rows is any iterable, typically read_items(); only one chunk is held in
+    memory at a time. progress(count) is called after each committed chunk.
+    Returns the number of rows read. A failure rolls back the current chunk
+    only; the chunks already committed stay imported.
+    """
+    db.execute(STAGING_TABLE)
+    rows = iter(rows)
+    count = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        with db.transaction(immediate=True) as cursor:
+            cursor.execute("DELETE FROM temp.import_rows")
+            cursor.executemany("INSERT INTO temp.import_rows VALUES (?, ?, ?, ?, ?)", chunk)
+            cursor.execute(UPSERT_SQL)
+        count += len(chunk)
+        if progress:
+            progress(count)
+    return count
+
+
+def export_items(db, lines, progress=None, chunk_size=CHUNK_SIZE):
+    """Write the catalog as CSV to an open file, streaming rows in id order
+
+    progress(count) is called every chunk_size rows. Returns the row count.
+    """
+    writer = csv.writer(lines)
+    writer.writerow(CSV_FIELDS)
+    cursor = db.execute(f"SELECT {', '.join(CSV_FIELDS)} FROM items ORDER BY id")
+    count = 0
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        writer.writerows(chunk)
+        count += len(chunk)
+        if progress:
+            progress(count)
+    return count
+
+
+def import_file(db, path, progress=None):
+    """Import a CSV file; see import_items"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return import_items(db, read_items(f), progress)
+
+
+def export_file(db, path, progress=None):
+    """Export the catalog to a CSV file; see export_items"""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        return export_items(db, f, progress)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import or export the item catalog as CSV")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path", help="CSV file to read or write")
+    parser.add_argument("--db", default=DB_PATH, help=f"database file (default: {DB_PATH})")
+    args = parser.parse_args(argv)
+
+    def progress(count):
+        print(f"\r{count} rows", end="", file=sys.stderr, flush=True)
+
+    db = Database(args.db)
+    try:
+        db.migrate()
+        if args.command == "import":
+            count = import_file(db, args.path, progress)
+        else:
+            count = export_file(db, args.path, progress)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print(f"\r{args.command.capitalize()}ed {count} rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
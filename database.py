@@ -0,0 +1,622 @@
+import random
+import sqlite3
+from contextlib import contextmanager
+import time
+from datetime import datetime
+
+from metrics import METRICS, sql_label
+
+DB_PATH = 'inventory.db'
+
+# Column order of every items row tuple passed around the application; the
+# treeviews show row[1:6], version is only used to detect concurrent edits
+ITEM_COLUMNS = "id, item_code, product_code, item_name, selling_price, date_added, version"
+
+ITEMS_TABLE = '''
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_code TEXT NOT NULL CHECK(length(item_code) > 0),
+    product_code TEXT UNIQUE NOT NULL CHECK(length(product_code) > 0),
+    item_name TEXT NOT NULL CHECK(length(item_name) > 0),
+    selling_price REAL NOT NULL CHECK(selling_price >= 0),
+    date_added TEXT NOT NULL
+)
+'''
+
+SAMPLE_ITEMS = [
+    ('100100091', '$2010', '2FOLD BLACK HALF MOON', 950.0, '2025-05-07 17:54:30'),
+    ('100200002', '$2050', '3 FOLD BLACK', 1145.0, '2025-05-07 17:54:30'),
+    ('100200003', '$2051', '3 FOLD PRINTED', 1150.0, '2025-05-07 17:54:30'),
+    ('100200004', '$2052', '3 FOLD SATIN', 1150.0, '2025-05-07 17:54:30'),
+    ('100200005', '$2053', '3 FOLD BLACK UV', 1245.0, '2025-05-07 17:56:33'),
+    ('100400009', '$2135', '27*16 GOLD METAL FRAME MANUAL OPEN BLACK', 1750.0, '2025-05-07 17:54:30'),
+    ('100400010', '$2104', '24*16 GOLD METAL FRAME MANUAL OPEN BLACK', 1570.0, '2025-05-07 17:54:30'),
+    ('100400011', '$2105', '24*16 GOLD METAL FRAME MANUAL OPEN MULTI', 1590.0, '2025-05-07 17:54:30'),
+    ('100400012', '$2106', '24*16 GOLD METAL FRAME MANUAL OPEN SILVER', 1720.0, '2025-05-07 17:54:30'),
+    ('100400163', '$2107', '24*16 MANUAL OPEN TELESCOPE (MULTI)', 1990.0, '2025-05-07 17:54:30')
+]
+
+# Categories the database is seeded with; edit the categories and
+# category_items tables to change them afterwards
+DEFAULT_CATEGORIES = {
+    "LADIES 2FOLD": [
+        "2 FOLD BLACK", "2 FOLD SATIN", "2 FOLD BLACK UV",
+        "2 FOLD PLAIN COLOUR WITH PRINT", "2 FOLD PLAIN BORDER DESIGN",
+        "2 FOLD PRINTED UV", "2 FOLD PRINTED FRIELD UMBRELLA",
+        "2 FOLD BLACK HALF MOON"
+    ],
+    "LADIES 3 FOLD": [
+        "3 FOLD BLACK", "3 FOLD PRINTED", "3 FOLD SATIN",
+        "3 FOLD BLACK UV", "3 FOLD PLAIN COLOUR WITH PRINT",
+        "3 FOLD PLAIN BORDER DESIGN", "3 FOLD UV PRINTED",
+        "3 FOLD PRINTED FRIELD UMBRELLA", "3 FOLD BLACK HALF MOON"
+    ],
+    "24\" GENTS": [
+        "24*16 GOLD METAL FRAME MANUAL OPEN BLACK",
+        "24*16 GOLD METAL FRAME MANUAL OPEN MULTI",
+        "24*16 GOLD METAL FRAME MANUAL OPEN SILVER",
+        "24*16 MANUAL OPEN TELESCOPE (MULTI)"
+    ],
+    "27\" GENTS": [
+        "27*16 GOLD METAL FRAME MANUAL OPEN BLACK",
+        "27*16 GOLD METAL FRAME MANUAL OPEN MULTI",
+        "27*16 GOLD METAL FRAME MANUAL OPEN UV",
+        "27*16 MANUAL OPEN TELESCOPE (MULTI)",
+        "27*16 METAL FRAME MULTI-SIXTY PANNEL"
+    ],
+    "30\" GENTS": [
+        "30*16 GOLD METAL FRAME MANUAL OPEN PLAIN",
+        "30*16 GOLD METAL FRAME MANUAL OPEN MULTI",
+        "30*16 GOLD METAL FRAME MANUAL OPEN UV",
+        "30*16 METAL FRAME MULTI-SIXTY PANNEL"
+    ],
+    "MUTHU UMBRELLA": [
+        "NORMAL MUTHU UMBRELLA WHITE", "NORMAL MUTHU UMBRELLA YELLOW",
+        "NORMAL FRILED WITH RIB COVER WHITE", "NORMAL FRILED WITH RIB COVER YELLOW",
+        "SEAQUEENS FRILED WITH RIB COVER WHITE", "SEAQUEENS FRILED WITH RIB COVER YELLOW",
+        "DESIGN FRILED WITH RIB COVER YELLOW", "DESIGN FRILED WITH RIB COVER WHITE",
+        "NORMAL MUTHU UMBRELLA WHITE SIXTY PANNEL", "NORMAL MUTHU UMBRELLA YELLOW SIXTY PANNEL"
+    ],
+    "CAR UMBRELLA": ["CAR UMBRELLA"],
+    "GARDEN UMBRELLA": [
+        "36*8 GARDEN UMBRELLA", "44*16 GARDEN UMBRELLA",
+        "44*16 GARDEN UMBRELLA SIXTY PANNEL"
+    ],
+    "BABY UMBRELLA": [
+        "BABY PLAIN", "BABY PRINTED", "BABY TELESCOPE UMBRELLA"
+    ],
+    "PIRIKARA UMBRELLA": [
+        "2 FOLD (BLACK)", "2 FOLD (BROWN)", "2 FOLD (ORANGE)",
+        "2 FOLD (YELLOW)", "2 FOLD (MEROON)", "24*16 MANUAL PIRIKARA (BLACK)",
+        "24*16 MANUAL PIRIKARA (BROWN)", "24*16 MANUAL PIRIKARA (ORANGE)",
+        "24*16 MANUAL PIRIKARA (MEROON)", "24*16 MANUAL PIRIKARA (YELLOW)"
+    ],
+    "MOSQUITO NETS": [
+        "SR-NORMAL NETS SMALL", "SR-NORMAL NETS MEDIUM",
+        "SR-NORMAL NETS LARGE", "SR-NORMAL NETS EXTRA LARGE"
+    ]
+}
+
+
+def _migrate_base_tables(cursor):
+    """Create the users and items tables"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL
+    )
+    ''')
+    cursor.execute(ITEMS_TABLE.format(name="items"))
+
+
+def _migrate_items_unique_product_code(cursor):
+    """Rebuild databases created while item_code (not product_code) was UNIQUE"""
+    columns = {}
+    for index in cursor.execute("PRAGMA index_list(items)").fetchall():
+        name, unique = index[1], index[2]
+        if unique:
+            columns[name] = [info[2] for info in cursor.execute(f"PRAGMA index_info({name})").fetchall()]
+    if ['product_code'] in columns.values() and ['item_code'] not in columns.values():
+        return
+
+    # The rebuilt table rejects these rows; name them all rather than fail on the first
+    problems = cursor.execute('''
+    SELECT id, product_code, CASE
+        WHEN product_code IS NULL OR length(product_code) = 0 THEN 'no product code'
+        WHEN item_code IS NULL OR length(item_code) = 0 THEN 'no item code'
+        WHEN item_name IS NULL OR length(item_name) = 0 THEN 'no item name'
+        WHEN selling_price IS NULL OR selling_price < 0 THEN 'no valid selling price'
+        WHEN date_added IS NULL THEN 'no date added'
+        ELSE 'duplicate product code' END
+    FROM items
+    WHERE product_code IS NULL OR length(product_code) = 0 OR item_code IS NULL OR length(item_code) = 0
+       OR item_name IS NULL OR length(item_name) = 0 OR selling_price IS NULL OR selling_price < 0
+       OR date_added IS NULL
+       OR product_code IN (SELECT product_code FROM items GROUP BY product_code HAVING COUNT(*) > 1)
+    ORDER BY product_code, id
+    ''').fetchall()
+    if problems:
+        listed = "; ".join(f"id {item_id} {product_code!r}: {reason}"
+                           for item_id, product_code, reason in problems[:20])
+        more = f" and {len(problems) - 20} more" if len(problems) > 20 else ""
+        raise sqlite3.IntegrityError(f"Cannot upgrade the items table, fix or remove these rows first: {listed}{more}")
+
+    cursor.execute(ITEMS_TABLE.format(name="items_rebuild"))
+    cursor.execute('''
+    INSERT INTO items_rebuild (id, item_code, product_code, item_name, selling_price, date_added)
+    SELECT id, item_code, product_code, item_name, selling_price, date_added FROM items ORDER BY id
+    ''')
+    cursor.execute("DROP TABLE items")
+    cursor.execute("ALTER TABLE items_rebuild RENAME TO items")
+
+
+def _migrate_item_indexes(cursor):
+    """Index the columns the item screens filter on"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_item_code ON items (item_code)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_item_name ON items (item_name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_selling_price ON items (selling_price)")
+
+
+def _migrate_seed_data(cursor):
+    """Insert the default admin user and the sample catalog"""
+    cursor.execute("INSERT OR IGNORE INTO users (username, password, role) VALUES (?, ?, ?)",
+                   ('admin', 'admin123', 'admin'))
+    cursor.executemany(
+        "INSERT OR IGNORE INTO items (item_code, product_code, item_name, selling_price, date_added) VALUES (?, ?, ?, ?, ?)",
+        SAMPLE_ITEMS
+    )
+
+
+def _migrate_categories(cursor):
+    """Store categories and the item names they group in the database"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL CHECK(length(name) > 0),
+        position INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS category_items (
+        category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+        item_name TEXT NOT NULL CHECK(length(item_name) > 0),
+        position INTEGER NOT NULL,
+        PRIMARY KEY (category_id, item_name)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_category_items_item_name ON category_items (item_name)")
+
+    for position, (category, item_names) in enumerate(DEFAULT_CATEGORIES.items()):
+        cursor.execute("INSERT OR IGNORE INTO categories (name, position) VALUES (?, ?)", (category, position))
+        category_id = cursor.execute("SELECT id FROM categories WHERE name=?", (category,)).fetchone()[0]
+        cursor.executemany(
+            "INSERT OR IGNORE INTO category_items (category_id, item_name, position) VALUES (?, ?, ?)",
+            ((category_id, item_name, index) for index, item_name in enumerate(item_names))
+        )
+
+
+def _migrate_items_fts(cursor):
+    """Full-text index over item names and codes, kept in sync by triggers"""
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        item_name, item_code, product_code,
+        content='items', content_rowid='id', prefix='1 2 3'
+    )
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts (rowid, item_name, item_code, product_code)
+        VALUES (new.id, new.item_name, new.item_code, new.product_code);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts (items_fts, rowid, item_name, item_code, product_code)
+        VALUES ('delete', old.id, old.item_name, old.item_code, old.product_code);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF item_name, item_code, product_code ON items BEGIN
+        INSERT INTO items_fts (items_fts, rowid, item_name, item_code, product_code)
+        VALUES ('delete', old.id, old.item_name, old.item_code, old.product_code);
+        INSERT INTO items_fts (rowid, item_name, item_code, product_code)
+        VALUES (new.id, new.item_name, new.item_code, new.product_code);
+    END
+    ''')
+    cursor.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild')")
+
+
+def _migrate_sales_ledger(cursor):
+    """Record every finalized bill and its lines; money is stored in cents"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        bill_no TEXT UNIQUE,
+        sold_at TEXT NOT NULL,
+        item_count INTEGER NOT NULL,
+        subtotal_cents INTEGER NOT NULL,
+        tax_cents INTEGER NOT NULL,
+        total_cents INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sale_lines (
+        sale_id INTEGER NOT NULL REFERENCES sales(id) ON DELETE CASCADE,
+        line_no INTEGER NOT NULL,
+        item_id INTEGER REFERENCES items(id) ON DELETE SET NULL,
+        item_code TEXT NOT NULL,
+        product_code TEXT NOT NULL,
+        item_name TEXT NOT NULL,
+        unit_price_cents INTEGER NOT NULL,
+        quantity INTEGER NOT NULL CHECK(quantity > 0),
+        PRIMARY KEY (sale_id, line_no)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_sold_at ON sales (sold_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sale_lines_item_id ON sale_lines (item_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sale_lines_product_code ON sale_lines (product_code)")
+
+
+def _migrate_stock(cursor):
+    """On-hand balance per item plus the append-only journal of movements behind it
+
+    Balances are materialized in stock and moved by a trigger on every
+    journal insert, so reading an item's stock is a primary key lookup no
+    matter how long the history gets. Sales take stock out (negative
+    quantity), receipts put it in, adjustments go either way.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stock (
+        item_id INTEGER PRIMARY KEY REFERENCES items(id) ON DELETE CASCADE,
+        on_hand INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stock_movements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        item_id INTEGER REFERENCES items(id) ON DELETE SET NULL,
+        kind TEXT NOT NULL CHECK(kind IN ('sale', 'receipt', 'adjustment')),
+        quantity INTEGER NOT NULL CHECK(quantity != 0),
+        sale_id INTEGER REFERENCES sales(id) ON DELETE SET NULL,
+        moved_at TEXT NOT NULL,
+        note TEXT,
+        CHECK(kind != 'sale' OR quantity < 0),
+        CHECK(kind != 'receipt' OR quantity > 0)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_item_id ON stock_movements (item_id, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_sale_id ON stock_movements (sale_id)")
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS stock_movements_apply AFTER INSERT ON stock_movements
+    WHEN new.item_id IS NOT NULL BEGIN
+        INSERT INTO stock (item_id, on_hand) VALUES (new.item_id, new.quantity)
+        ON CONFLICT(item_id) DO UPDATE SET on_hand = on_hand + excluded.on_hand;
+    END
+    ''')
+
+
+def _migrate_item_versions(cursor):
+    """Row version for optimistic concurrency; every write to an item bumps it"""
+    cursor.execute("ALTER TABLE items ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+def _migrate_sales_rollups(cursor):
+    """Per-day, per-day-and-item and per-day-and-category sales totals, filled from the ledger"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sales_daily (
+        day TEXT PRIMARY KEY,
+        bills INTEGER NOT NULL,
+        units INTEGER NOT NULL,
+        subtotal_cents INTEGER NOT NULL,
+        tax_cents INTEGER NOT NULL,
+        total_cents INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sales_daily_items (
+        day TEXT NOT NULL,
+        product_code TEXT NOT NULL,
+        item_code TEXT NOT NULL,
+        item_name TEXT NOT NULL,
+        units INTEGER NOT NULL,
+        revenue_cents INTEGER NOT NULL,
+        PRIMARY KEY (day, product_code)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sales_daily_categories (
+        day TEXT NOT NULL,
+        category TEXT NOT NULL,
+        units INTEGER NOT NULL,
+        revenue_cents INTEGER NOT NULL,
+        PRIMARY KEY (day, category)
+    )
+    ''')
+    # Backfill from the ledger as it stands; reports.rebuild_rollups recomputes them later
+    cursor.execute('''
+    INSERT INTO sales_daily (day, bills, units, subtotal_cents, tax_cents, total_cents)
+    SELECT substr(sold_at, 1, 10), COUNT(*), SUM(item_count), SUM(subtotal_cents), SUM(tax_cents), SUM(total_cents)
+    FROM sales GROUP BY 1
+    ''')
+    cursor.execute('''
+    INSERT INTO sales_daily_items (day, product_code, item_code, item_name, units, revenue_cents)
+    SELECT substr(s.sold_at, 1, 10), l.product_code, MAX(l.item_code), MAX(l.item_name), SUM(l.quantity),
+           SUM(l.unit_price_cents * l.quantity)
+    FROM sale_lines l JOIN sales s ON s.id = l.sale_id GROUP BY 1, 2
+    ''')
+    cursor.execute('''
+    INSERT INTO sales_daily_categories (day, category, units, revenue_cents)
+    SELECT substr(s.sold_at, 1, 10), COALESCE(c.name, ''), SUM(l.quantity), SUM(l.unit_price_cents * l.quantity)
+    FROM sale_lines l JOIN sales s ON s.id = l.sale_id
+    LEFT JOIN category_items ci ON ci.item_name = l.item_name
+    LEFT JOIN categories c ON c.id = ci.category_id
+    GROUP BY 1, 2
+    ''')
+
+
+def _migrate_price_history(cursor):
+    """Append-only selling price history per product code, written by triggers on items
+
+    A row with a NULL price marks a product code that stopped being sold:
+    the item was deleted or moved to another code. Existing items start
+    their history at date_added.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS price_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_code TEXT NOT NULL,
+        selling_price REAL,
+        valid_from TEXT NOT NULL
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_history_product_code ON price_history (product_code, valid_from)")
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS items_price_insert AFTER INSERT ON items BEGIN
+        INSERT INTO price_history (product_code, selling_price, valid_from)
+        VALUES (new.product_code, new.selling_price, new.date_added);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS items_price_update AFTER UPDATE OF product_code, selling_price ON items
+    WHEN old.product_code IS NOT new.product_code OR old.selling_price IS NOT new.selling_price BEGIN
+        INSERT INTO price_history (product_code, selling_price, valid_from)
+        SELECT old.product_code, NULL, datetime('now', 'localtime') WHERE old.product_code IS NOT new.product_code;
+        INSERT INTO price_history (product_code, selling_price, valid_from)
+        VALUES (new.product_code, new.selling_price, datetime('now', 'localtime'));
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS items_price_delete AFTER DELETE ON items BEGIN
+        INSERT INTO price_history (product_code, selling_price, valid_from)
+        VALUES (old.product_code, NULL, datetime('now', 'localtime'));
+    END
+    ''')
+    cursor.execute('''
+    INSERT INTO price_history (product_code, selling_price, valid_from)
+    SELECT product_code, selling_price, date_added FROM items ORDER BY id
+    ''')
+
+
+def _migrate_item_filter_indexes(cursor):
+    """Composite indexes behind the search_items filters
+
+    A code or name (exact or prefix) narrowed by a price range, a price
+    range narrowed by dates, and date ranges alone. Each replaces the
+    single-column index it starts with.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_item_code_price ON items (item_code, selling_price)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_item_name_price ON items (item_name, selling_price)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_price_date ON items (selling_price, date_added)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_date_added ON items (date_added)")
+    cursor.execute("DROP INDEX IF EXISTS idx_items_item_code")
+    cursor.execute("DROP INDEX IF EXISTS idx_items_item_name")
+    cursor.execute("DROP INDEX IF EXISTS idx_items_selling_price")
+
+
+def _migrate_price_insert_time(cursor):
+    """Stamp the price history row of a new item with the time of the insert
+
+    date_added can predate the code's latest history row (an item deleted
+    and imported again from an old export), which left it withdrawn.
+    """
+    cursor.execute("DROP TRIGGER IF EXISTS items_price_insert")
+    cursor.execute('''
+    CREATE TRIGGER items_price_insert AFTER INSERT ON items BEGIN
+        INSERT INTO price_history (product_code, selling_price, valid_from)
+        VALUES (new.product_code, new.selling_price, datetime('now', 'localtime'));
+    END
+    ''')
+
+
+# Ordered (version, migration) pairs. Append new entries; never edit or
+# reorder ones that have shipped, existing inventory.db files depend on them.
+MIGRATIONS = [
+    (1, _migrate_base_tables),
+    (2, _migrate_items_unique_product_code),
+    (3, _migrate_item_indexes),
+    (4, _migrate_seed_data),
+    (5, _migrate_categories),
+    (6, _migrate_items_fts),
+    (7, _migrate_sales_ledger),
+    (8, _migrate_stock),
+    (9, _migrate_item_versions),
+    (10, _migrate_sales_rollups),
+    (11, _migrate_price_history),
+    (12, _migrate_item_filter_indexes),
+    (13, _migrate_price_insert_time),
+]
+
+
+class TimedCursor:
+    """sqlite3 cursor whose execute/executemany calls are recorded in METRICS"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        self.cursor.execute(sql, params)
+        METRICS.record(sql_label(sql), time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        start = time.perf_counter()
+        self.cursor.executemany(sql, seq_of_params)
+        METRICS.record(sql_label(sql), time.perf_counter() - start)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+
+class Database:
+    """Long-lived SQLite connection shared by every handler in the application"""
+
+    # Pragmas applied once when the connection is opened
+    PRAGMAS = (
+        ("journal_mode", "WAL"),         # readers never block the single writer
+        ("synchronous", "NORMAL"),       # safe with WAL, avoids an fsync per commit
+        ("cache_size", -16000),          # ~16 MB page cache
+        ("mmap_size", 268435456),        # map up to 256 MB of the file
+        ("busy_timeout", 1000),          # wait for other tills, then retry with backoff
+        ("temp_store", "MEMORY"),
+        ("foreign_keys", "ON"),
+    )
+
+    # Size of sqlite3's prepared statement LRU (keyed by the SQL text)
+    STATEMENT_CACHE_SIZE = 256
+
+    # Further attempts at BEGIN IMMEDIATE once busy_timeout has run out, and
+    # the first pause between them in seconds (doubled each time, jittered so
+    # tills that collided do not retry in lockstep)
+    BUSY_RETRIES = 5
+    BUSY_BACKOFF = 0.05
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        # isolation_level=None puts the driver in autocommit mode so writes are
+        # grouped only by explicit transaction() blocks
+        self.conn = sqlite3.connect(path, isolation_level=None,
+                                    cached_statements=self.STATEMENT_CACHE_SIZE)
+        for name, value in self.PRAGMAS:
+            self.conn.execute(f"PRAGMA {name}={value}")
+
+    def execute(self, sql, params=()):
+        """Run a single statement and return its cursor"""
+        start = time.perf_counter()
+        cursor = self.conn.execute(sql, params)
+        METRICS.record(sql_label(sql), time.perf_counter() - start)
+        return cursor
+
+    def executemany(self, sql, seq_of_params):
+        """Run one statement for every parameter tuple"""
+        start = time.perf_counter()
+        cursor = self.conn.executemany(sql, seq_of_params)
+        METRICS.record(sql_label(sql), time.perf_counter() - start)
+        return cursor
+
+    def query_one(self, sql, params=()):
+        """Return the first row of a query or None"""
+        start = time.perf_counter()
+        row = self.conn.execute(sql, params).fetchone()
+        METRICS.record(sql_label(sql), time.perf_counter() - start)
+        return row
+
+    def query_all(self, sql, params=()):
+        """Return every row of a query"""
+        start = time.perf_counter()
+        rows = self.conn.execute(sql, params).fetchall()
+        METRICS.record(sql_label(sql), time.perf_counter() - start)
+        return rows
+
+    def begin(self, cursor, statement):
+        """Start a transaction, retrying while another connection holds the write lock"""
+        for attempt in range(self.BUSY_RETRIES + 1):
+            try:
+                cursor.execute(statement)
+                return
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or attempt == self.BUSY_RETRIES:
+                    raise
+            METRICS.record("sql:busy retry", 0.0)
+            time.sleep(self.BUSY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """Group statements into one atomic write, rolling back on error
+
+        immediate=True takes the write lock up front (BEGIN IMMEDIATE), so a
+        read-then-write transaction waits for other writers via busy_timeout
+        instead of failing when it tries to upgrade its lock. Inside another
+        transaction the block becomes a savepoint: an error undoes only the
+        block, and nothing commits until the outer transaction does. A
+        database still locked after busy_timeout is retried BUSY_RETRIES
+        times before the OperationalError is raised.
+        """
+        cursor = TimedCursor(self.conn.cursor())
+        if self.conn.in_transaction:
+            cursor.execute("SAVEPOINT nested")
+            try:
+                yield cursor
+            except BaseException:
+                self.conn.execute("ROLLBACK TO nested")
+                self.conn.execute("RELEASE nested")
+                raise
+            else:
+                self.conn.execute("RELEASE nested")
+            return
+        self.begin(cursor, "BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield cursor
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        else:
+            with METRICS.timer("sql:COMMIT"):
+                self.conn.execute("COMMIT")
+
+    def schema_version(self):
+        """Return the highest migration applied to this database"""
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            applied_at TEXT NOT NULL
+        )
+        ''')
+        return self.query_one("SELECT COALESCE(MAX(version), 0) FROM schema_version")[0]
+
+    def migrate(self):
+        """Apply every pending migration, each in its own transaction"""
+        current = self.schema_version()
+        for version, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            with self.transaction(immediate=True) as cursor:
+                # Another till may have applied it while this one waited for the write lock
+                if cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0] >= version:
+                    continue
+                migration(cursor)
+                cursor.execute("INSERT INTO schema_version (version, applied_at) VALUES (?, ?)",
+                               (version, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        return self.schema_version()
+
+    def close(self):
+        """Let SQLite refresh its planner statistics and close the connection; never raises
+
+        optimize needs the write lock when it analyzes; if another till
+        holds it the statistics are simply left for a later close.
+        """
+        if self.conn is not None:
+            try:
+                self.conn.execute("PRAGMA analysis_limit=400")
+                self.conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            finally:
+                self.conn.close()
+                self.conn = None
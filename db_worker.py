@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+
+from database import Database
+from metrics import METRICS
+
+
+class Job:
+    """A unit of database work submitted to the DBWorker"""
+
+    __slots__ = ("func", "on_done", "on_error", "channel", "name", "cancelled")
+
+    def __init__(self, func, on_done, on_error, channel, name):
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.channel = channel
+        self.name = name or channel or getattr(func, "__name__", "job")
+        self.cancelled = False
+
+
+class DBWorker:
+    """Run database jobs on a dedicated thread with its own connection
+
+    Jobs are plain callables taking the worker's Database. Their results are
+    queued and delivered on the Tk thread by polling with root.after, so
+    callbacks may touch widgets. Submitting a job on a channel cancels the
+    previous job on that channel: a queued one is skipped, a running one is
+    interrupted, and either way its result is never delivered.
+    """
+
+    POLL_MS = 15
+
+    def __init__(self, root, path, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.calls = queue.Queue()
+        self.latest = {}
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.current = None
+        self.db = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(path,), name="db-worker", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        self.poll_job = self.root.after(self.POLL_MS, self._poll)
+
+    def submit(self, func, on_done=None, on_error=None, channel=None, name=None):
+        """Queue func(db) for the worker thread and return its Job
+
+        name labels the job in METRICS; it defaults to the channel or the
+        function's name.
+        """
+        job = Job(func, on_done, on_error, channel, name)
+        if channel is not None:
+            previous = self.latest.get(channel)
+            if previous is not None:
+                self.cancel(previous)
+            self.latest[channel] = job
+        self._set_pending(self.pending + 1)
+        self.jobs.put(job)
+        return job
+
+    def cancel(self, job):
+        """Make sure a job's result is never delivered, interrupting it if running"""
+        job.cancelled = True
+        with self.lock:
+            if self.current is job:
+                self.db.conn.interrupt()
+
+    def call_soon(self, func):
+        """Run func() on the Tk thread at the next poll; safe to call from a job"""
+        self.calls.put(func)
+
+    def stop(self):
+        """Finish the queued jobs, then close the worker's connection"""
+        self.root.after_cancel(self.poll_job)
+        self.jobs.put(None)
+        self.thread.join()
+
+    def _run(self, path):
+        self.db = Database(path)
+        self.ready.set()
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if job.cancelled:
+                self.results.put((job, None, None))
+                continue
+            with self.lock:
+                self.current = job
+            start = time.perf_counter()
+            try:
+                result, error = job.func(self.db), None
+            except Exception as e:
+                result, error = None, e
+            METRICS.record(f"job:{job.name}", time.perf_counter() - start)
+            with self.lock:
+                self.current = None
+            self.results.put((job, result, error))
+        self.db.close()
+
+    def _poll(self):
+        """Deliver finished jobs on the Tk thread"""
+        while True:
+            try:
+                func = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            func()
+        while True:
+            try:
+                job, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self._set_pending(self.pending - 1)
+            if job.channel is not None and self.latest.get(job.channel) is job:
+                del self.latest[job.channel]
+            if job.cancelled:
+                continue
+            # Callbacks update the widgets, so they count as UI time
+            with METRICS.timer(f"ui:{job.name} done"):
+                if error is not None:
+                    if job.on_error:
+                        job.on_error(error)
+                elif job.on_done:
+                    job.on_done(result)
+        self.poll_job = self.root.after(self.POLL_MS, self._poll)
+
+    def _set_pending(self, pending):
+        was_busy = self.pending > 0
+        self.pending = pending
+        if self.on_busy and was_busy != (pending > 0):
+            self.on_busy(pending > 0)
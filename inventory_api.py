@@ -0,0 +1,309 @@
+"""Local HTTP/JSON service over the inventory database for price checkers and extra tills
+
+Run with: python inventory_api.py [--host 127.0.0.1] [--port 8765] [--pool 4]
+
+  GET  /items/CODE                      one item by product code, else item code
+  GET  /items?item_code=&product_code=&item_name=&selling_price=&limit=
+             &item_code_prefix=&product_code_prefix=&item_name_prefix=
+             &min_price=&max_price=&added_from=YYYY-MM-DD&added_to=YYYY-MM-DD
+                                        rows matching every given filter
+  POST /sales  {"lines": [{"code": "...", "quantity": 1}]}
+                                        record a sale and return its bill
+
+Standard library only. Requests are parsed on one asyncio event loop and
+the database work runs on a fixed pool of connections, each owned by its
+own thread, so a slow checkout never stalls the price lookups queued
+behind it on the loop. Connections are kept alive between requests.
+"""
+import argparse
+import asyncio
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import inventory_core
+from database import DB_PATH, ITEM_COLUMNS, Database
+from metrics import METRICS
+from sales import format_bill
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+POOL_SIZE = 4
+# Rows returned by GET /items when the request gives no limit
+SEARCH_LIMIT = 100
+# Largest request body accepted, in bytes
+MAX_BODY = 64 * 1024
+
+ITEM_FIELDS = tuple(column.strip() for column in ITEM_COLUMNS.split(","))
+# GET /items parameters passed to search_items as they are; the prices are converted there
+SEARCH_FILTERS = ("item_code", "product_code", "item_name", "item_code_prefix", "product_code_prefix",
+                  "item_name_prefix", "min_price", "max_price", "added_from", "added_to")
+
+
+class HTTPError(Exception):
+    """Answer the current request with an error status and message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ConnectionPool:
+    """A fixed number of Database connections, each served by its own thread
+
+    sqlite3 connections belong to the thread that opened them, so instead
+    of lending connections out, run() queues func(db) for whichever pool
+    thread is free and awaits the result.
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.jobs = queue.SimpleQueue()
+        self.threads = [threading.Thread(target=self._serve, args=(path,), name=f"db-pool-{i}", daemon=True)
+                        for i in range(size)]
+        for thread in self.threads:
+            thread.start()
+
+    async def run(self, func):
+        """Run func(db) on a pool connection and return its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.jobs.put((func, future, loop))
+        return await future
+
+    def close(self):
+        """Finish the queued jobs, then close every connection"""
+        for thread in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def _serve(self, path):
+        db = Database(path)
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            func, future, loop = job
+            try:
+                result = func(db)
+            except Exception as e:
+                loop.call_soon_threadsafe(_settle, future, None, e)
+            else:
+                loop.call_soon_threadsafe(_settle, future, result, None)
+        db.close()
+
+
+def _settle(future, result, error):
+    # The request may have been abandoned while its job ran
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def item_json(row):
+    return dict(zip(ITEM_FIELDS, row))
+
+
+def sale_json(receipt, sale_id, bill_no, sold_at):
+    return {
+        "sale_id": sale_id,
+        "bill_no": bill_no,
+        "sold_at": sold_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "item_count": receipt.count,
+        "subtotal_cents": receipt.subtotal_cents,
+        "tax_cents": receipt.tax_cents,
+        "total_cents": receipt.subtotal_cents + receipt.tax_cents,
+        "lines": [{"item_id": line.key, "item_code": line.item_code, "product_code": line.product_code,
+                   "item_name": line.item_name, "unit_price_cents": line.price_cents, "quantity": line.quantity}
+                  for line in receipt],
+        "bill": format_bill(receipt, bill_no, sold_at),
+    }
+
+
+def parse_sale_lines(document):
+    """[(code, quantity)] from a POST /sales body"""
+    lines = document.get("lines") if isinstance(document, dict) else None
+    if not isinstance(lines, list) or not lines:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, 'Body must be {"lines": [{"code": ..., "quantity": ...}]}')
+    codes = []
+    for line in lines:
+        if not isinstance(line, dict) or not isinstance(line.get("code"), str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Every line needs a code")
+        quantity = line.get("quantity", 1)
+        if not isinstance(quantity, int) or isinstance(quantity, bool):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Quantity for {line['code']} must be a whole number")
+        codes.append((line["code"], quantity))
+    return codes
+
+
+class InventoryAPI:
+    """Routes requests to inventory_core on the connection pool"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def get_item(self, code):
+        row = await self.pool.run(lambda db: inventory_core.find_item(db, code))
+        if row is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No item with code {code}")
+        return item_json(row)
+
+    async def search(self, params):
+        unknown = set(params) - set(SEARCH_FILTERS) - {"selling_price", "limit"}
+        if unknown:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        try:
+            selling_price = float(params["selling_price"]) if params.get("selling_price") else None
+            limit = int(params.get("limit", SEARCH_LIMIT))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "selling_price and limit must be numbers") from None
+        filters = {name: params[name] for name in SEARCH_FILTERS if params.get(name)}
+        rows = await self.pool.run(lambda db: inventory_core.search_items(
+            db, selling_price=selling_price, limit=limit, **filters))
+        return {"items": [item_json(row) for row in rows]}
+
+    async def sell(self, body):
+        try:
+            document = json.loads(body)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON") from None
+        codes = parse_sale_lines(document)
+        sold_at = datetime.now()
+        receipt, sale_id, bill_no = await self.pool.run(lambda db: inventory_core.sell(db, codes, sold_at))
+        return sale_json(receipt, sale_id, bill_no, sold_at)
+
+    async def dispatch(self, method, target, body):
+        """Return (status, document) for one request"""
+        url = urlsplit(target)
+        path = url.path.rstrip("/")
+        if path.startswith("/items/") and len(path) > len("/items/"):
+            if method != "GET":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET")
+            return HTTPStatus.OK, await self.get_item(unquote(path[len("/items/"):]))
+        if path == "/items":
+            if method != "GET":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET")
+            return HTTPStatus.OK, await self.search(dict(parse_qsl(url.query)))
+        if path == "/sales":
+            if method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST")
+            return HTTPStatus.CREATED, await self.sell(body)
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {url.path}")
+
+    async def respond(self, method, target, body):
+        """dispatch() with every failure turned into a JSON error document"""
+        start = time.perf_counter()
+        try:
+            status, document = await self.dispatch(method, target, body)
+        except HTTPError as e:
+            status, document = e.status, {"error": str(e)}
+        except ValueError as e:
+            status, document = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except sqlite3.OperationalError as e:
+            status, document = HTTPStatus.SERVICE_UNAVAILABLE, {"error": f"Database busy: {e}"}
+        except sqlite3.Error as e:
+            status, document = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Database error: {e}"}
+        METRICS.record(f"api:{method} {status.value}", time.perf_counter() - start)
+        return status, document
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    status, document = HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"}
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, document = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, document = await self.respond(method, target, body)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                payload = json.dumps(document).encode()
+                connection = "" if keep_alive else "Connection: close\r\n"
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                    f"{connection}\r\n".encode("latin-1") + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, path, pool_size, ready=None):
+    """Migrate the database and serve until cancelled; ready(port) is called once listening"""
+    db = Database(path)
+    try:
+        db.migrate()
+    finally:
+        db.close()
+    pool = ConnectionPool(path, pool_size)
+    api = InventoryAPI(pool)
+    server = await asyncio.start_server(api.handle, host, port)
+    try:
+        if ready:
+            ready(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON access to the inventory database")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"0 picks a free port (default: {DEFAULT_PORT})")
+    parser.add_argument("--pool", type=int, default=POOL_SIZE, help=f"database connections (default: {POOL_SIZE})")
+    parser.add_argument("--db", default=DB_PATH, help=f"database file (default: {DB_PATH})")
+    args = parser.parse_args(argv)
+
+    def ready(port):
+        print(f"Listening on http://{args.host}:{port}", flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.db, args.pool, ready))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+"""Headless command line for the inventory database; never imports tkinter
+
+Run with: python inventory_cli.py <command> ...   (see --help)
+
+  add ITEM_CODE PRODUCT_CODE ITEM_NAME PRICE
+  update ID ITEM_CODE PRODUCT_CODE ITEM_NAME PRICE   (ID is the first column of search)
+  delete ID
+  category ITEM_NAME CATEGORY   file an item name under a category (then rebuild-reports)
+  search [--item-code C] [--product-code C] [--name N] [--price P] [--text WORDS]
+         [--item-code-prefix C] [--product-code-prefix C] [--name-prefix N]
+         [--min-price P] [--max-price P] [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--limit N] [--explain]
+  sell CODE[:QTY] ... [--save]
+  totals [--date YYYY-MM-DD]
+  report daily|weekly|items|categories [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+  rebuild-reports   recompute the report rollups from the sales ledger
+  price PRODUCT_CODE [--at WHEN]   price history and the price at a time
+  price-list [--at WHEN]           every price in force at a time
+  stock CODE        on-hand quantity and latest movements
+  receive CODE QTY [--note TEXT] / adjust CODE +-QTY [--note TEXT]
+  import FILE.csv / export FILE.csv
+  batch FILE        one of add/update/delete/category/sell/receive/adjust per line, all in one transaction
+"""
+import argparse
+import shlex
+import sqlite3
+import sys
+from datetime import date, datetime
+
+import inventory_core
+from catalog import assign_category, search_tokens, text_search
+from catalog_csv import export_file, import_file
+from database import DB_PATH, ITEM_COLUMNS, Database
+from prices import as_of_text, price_at, price_history, price_list_at
+from reports import (UNCATEGORIZED, category_totals, daily_revenue, date_range, item_totals, rebuild_rollups,
+                     weekly_revenue)
+from sales import format_bill, save_bill
+
+# Commands allowed inside a batch file
+BATCH_COMMANDS = ("add", "update", "delete", "category", "sell", "receive", "adjust")
+
+
+def print_rows(rows):
+    for row in rows:
+        print("\t".join(str(value) for value in row))
+
+
+def parse_when(text):
+    """--at value: YYYY-MM-DD (the end of that day) or YYYY-MM-DD HH:MM[:SS]; default now"""
+    if not text:
+        return datetime.now()
+    try:
+        return date.fromisoformat(text) if len(text) == 10 else datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Cannot read {text!r} as a date or time") from None
+
+
+def parse_sale_code(text):
+    """Split "CODE" or "CODE:QTY" into (code, quantity)"""
+    code, sep, quantity = text.rpartition(":")
+    if sep and code and quantity.isdigit():
+        return code, int(quantity)
+    return text, 1
+
+
+# Each command does its database work and returns a function that reports
+# the result; the report runs only after the surrounding transaction commits,
+# so a rolled-back batch neither prints results nor writes bill files
+
+def cmd_add(db, args):
+    row = inventory_core.add_item(db, args.item_code, args.product_code, args.item_name, args.price)
+    return lambda: print(f"Added item {row[0]}: {row[2]}")
+
+
+def cmd_update(db, args):
+    old_row, new_row = inventory_core.update_item(db, args.id, args.item_code, args.product_code, args.item_name,
+                                                  args.price)
+    return lambda: print(f"Updated item {new_row[0]}: {new_row[2]}")
+
+
+def cmd_delete(db, args):
+    old_row = inventory_core.delete_item(db, args.id)
+    return lambda: print(f"Deleted item {old_row[0]}: {old_row[2]}")
+
+
+def cmd_category(db, args):
+    assign_category(db, args.item_name, args.category)
+    return lambda: print(f"Filed {args.item_name} under {args.category}")
+
+
+def cmd_search(db, args):
+    if args.text:
+        tokens = search_tokens(args.text)
+        if not tokens:
+            raise ValueError("Enter at least one letter or digit to search for")
+        keys = text_search(db, tokens)
+        rows = [db.query_one(f"SELECT {ITEM_COLUMNS} FROM items WHERE id=?", (key,)) for key in keys]
+        return lambda: print_rows(rows)
+    filters = dict(item_code=args.item_code, product_code=args.product_code, item_name=args.name,
+                   selling_price=args.price, item_code_prefix=args.item_code_prefix,
+                   product_code_prefix=args.product_code_prefix, item_name_prefix=args.name_prefix,
+                   min_price=args.min_price, max_price=args.max_price, added_from=args.start, added_to=args.end)
+    if args.explain:
+        plan = inventory_core.explain_search(db, limit=args.limit, **filters)
+        return lambda: print("\n".join(plan))
+    rows = inventory_core.search_items(db, limit=args.limit, **filters)
+    return lambda: print_rows(rows)
+
+
+def cmd_sell(db, args):
+    sold_at = datetime.now()
+    receipt, sale_id, bill_no = inventory_core.sell(db, [parse_sale_code(code) for code in args.codes], sold_at)
+
+    def report():
+        bill_text = format_bill(receipt, bill_no, sold_at)
+        if args.save:
+            filename, in_app_folder = save_bill(bill_text, bill_no)
+            print(f"Bill saved to {filename}", file=sys.stderr)
+        print(bill_text)
+    return report
+
+
+def cmd_totals(db, args):
+    day = date.fromisoformat(args.date) if args.date else date.today()
+    bills, items, subtotal, tax, total = inventory_core.daily_totals(db, day)
+
+    def report():
+        print(f"Date:     {day}")
+        print(f"Bills:    {bills}")
+        print(f"Items:    {items}")
+        print(f"Subtotal: Rs:{subtotal / 100:.2f}")
+        print(f"Tax:      Rs:{tax / 100:.2f}")
+        print(f"Total:    Rs:{total / 100:.2f}")
+    return report
+
+
+def cmd_report(db, args):
+    start, end = date_range(args.start and date.fromisoformat(args.start), args.end and date.fromisoformat(args.end))
+    if args.kind in ("daily", "weekly"):
+        read = daily_revenue if args.kind == "daily" else weekly_revenue
+        rows = [(day, bills, units, f"{subtotal / 100:.2f}", f"{tax / 100:.2f}", f"{total / 100:.2f}")
+                for day, bills, units, subtotal, tax, total in read(db, start, end)]
+    elif args.kind == "items":
+        rows = [(product_code, item_code, item_name, units, f"{revenue / 100:.2f}")
+                for product_code, item_code, item_name, units, revenue in item_totals(db, start, end)]
+    else:
+        rows = [(category or UNCATEGORIZED, units, f"{revenue / 100:.2f}")
+                for category, units, revenue in category_totals(db, start, end)]
+    return lambda: print_rows(rows)
+
+
+def cmd_rebuild_reports(db, args):
+    days = rebuild_rollups(db)
+    return lambda: print(f"Rebuilt report totals for {days} day(s)", file=sys.stderr)
+
+
+def cmd_price(db, args):
+    history = price_history(db, args.product_code)
+    if not history:
+        raise ValueError(f"No price history for product code {args.product_code}")
+    when = parse_when(args.at)
+    price = price_at(db, args.product_code, when)
+
+    def report():
+        print_rows((valid_from, "withdrawn" if selling_price is None else selling_price)
+                   for valid_from, selling_price in history)
+        print(f"Price at {as_of_text(when)}: {'not on sale' if price is None else price}")
+    return report
+
+
+def cmd_price_list(db, args):
+    rows = price_list_at(db, parse_when(args.at))
+    return lambda: print_rows(rows)
+
+
+def cmd_stock(db, args):
+    row, quantity, recent = inventory_core.stock_level(db, args.code)
+
+    def report():
+        print(f"{row[2]}\t{row[3]}\ton hand: {quantity}")
+        print_rows(recent)
+    return report
+
+
+def cmd_move_stock(db, args):
+    move = inventory_core.receive_stock if args.command == "receive" else inventory_core.adjust_stock
+    row, quantity = move(db, args.code, args.quantity, args.note)
+    return lambda: print(f"{row[2]} {row[3]}: {quantity} on hand")
+
+
+def cmd_import(db, args):
+    count = import_file(db, args.path, lambda count: print(f"\r{count} rows", end="", file=sys.stderr, flush=True))
+    return lambda: print(f"\rImported {count} rows", file=sys.stderr)
+
+
+def cmd_export(db, args):
+    count = export_file(db, args.path)
+    return lambda: print(f"Exported {count} rows", file=sys.stderr)
+
+
+def cmd_batch(db, args):
+    # Parse every line up front so a typo fails before anything is written
+    commands = []
+    with open(args.path) as f:
+        for line_num, line in enumerate(f, 1):
+            words = shlex.split(line, comments=True)
+            if not words:
+                continue
+            if words[0] not in BATCH_COMMANDS:
+                raise ValueError(f"Line {line_num}: {words[0]} is not allowed in a batch")
+            try:
+                commands.append(build_parser().parse_args(words))
+            except SystemExit:
+                raise ValueError(f"Line {line_num}: could not parse {line.strip()!r}") from None
+
+    reports = []
+    with db.transaction(immediate=True):
+        for command in commands:
+            reports.append(command.func(db, command))
+
+    def report():
+        for done in reports:
+            done()
+        print(f"Batch of {len(commands)} command(s) committed", file=sys.stderr)
+    return report
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Inventory operations without the GUI")
+    parser.add_argument("--db", default=DB_PATH, help=f"database file (default: {DB_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, func, help_text in (("add", cmd_add, "add an item"),
+                                  ("update", cmd_update, "replace the fields of the item with an id")):
+        command = commands.add_parser(name, help=help_text)
+        if name == "update":
+            command.add_argument("id", type=int)
+        command.add_argument("item_code")
+        command.add_argument("product_code")
+        command.add_argument("item_name")
+        command.add_argument("price")
+        command.set_defaults(func=func)
+
+    command = commands.add_parser("delete", help="delete the item with an id")
+    command.add_argument("id", type=int)
+    command.set_defaults(func=cmd_delete)
+
+    command = commands.add_parser("category", help="file an item name under a category, creating it if needed")
+    command.add_argument("item_name")
+    command.add_argument("category")
+    command.set_defaults(func=cmd_category)
+
+    command = commands.add_parser("search", help="list items matching every filter")
+    command.add_argument("--item-code", default="")
+    command.add_argument("--product-code", default="")
+    command.add_argument("--name", default="")
+    command.add_argument("--price", type=float)
+    command.add_argument("--item-code-prefix", default="")
+    command.add_argument("--product-code-prefix", default="")
+    command.add_argument("--name-prefix", default="")
+    command.add_argument("--min-price", type=float)
+    command.add_argument("--max-price", type=float)
+    command.add_argument("--from", dest="start", help="added on or after YYYY-MM-DD")
+    command.add_argument("--to", dest="end", help="added on or before YYYY-MM-DD")
+    command.add_argument("--limit", type=int, default=-1)
+    command.add_argument("--explain", action="store_true", help="print the query plan instead of the rows")
+    command.add_argument("--text", help="search-as-you-type words over names and codes")
+    command.set_defaults(func=cmd_search)
+
+    command = commands.add_parser("sell", help="record a sale and print its bill")
+    command.add_argument("codes", nargs="+", metavar="CODE[:QTY]")
+    command.add_argument("--save", action="store_true", help="also write the bill files")
+    command.set_defaults(func=cmd_sell)
+
+    command = commands.add_parser("totals", help="end-of-day sales totals")
+    command.add_argument("--date", help="YYYY-MM-DD (default: today)")
+    command.set_defaults(func=cmd_totals)
+
+    command = commands.add_parser("report", help="sales totals from the report rollups")
+    command.add_argument("kind", choices=("daily", "weekly", "items", "categories"))
+    command.add_argument("--from", dest="start", help="YYYY-MM-DD (default: 29 days before --to)")
+    command.add_argument("--to", dest="end", help="YYYY-MM-DD (default: today)")
+    command.set_defaults(func=cmd_report)
+
+    command = commands.add_parser("rebuild-reports", help="recompute the report rollups from the sales ledger")
+    command.set_defaults(func=cmd_rebuild_reports)
+
+    command = commands.add_parser("price", help="price history of a product code")
+    command.add_argument("product_code")
+    command.add_argument("--at", help="YYYY-MM-DD or 'YYYY-MM-DD HH:MM:SS' (default: now)")
+    command.set_defaults(func=cmd_price)
+
+    command = commands.add_parser("price-list", help="every product code's price at a time")
+    command.add_argument("--at", help="YYYY-MM-DD or 'YYYY-MM-DD HH:MM:SS' (default: now)")
+    command.set_defaults(func=cmd_price_list)
+
+    command = commands.add_parser("stock", help="show an item's stock on hand")
+    command.add_argument("code")
+    command.set_defaults(func=cmd_stock)
+
+    for name, help_text in (("receive", "add delivered units to stock"),
+                            ("adjust", "correct stock by a signed quantity, e.g. -2")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("code")
+        command.add_argument("quantity")
+        command.add_argument("--note")
+        command.set_defaults(func=cmd_move_stock)
+
+    command = commands.add_parser("import", help="upsert items from a CSV price list")
+    command.add_argument("path")
+    command.set_defaults(func=cmd_import)
+
+    command = commands.add_parser("export", help="write the catalog to a CSV file")
+    command.add_argument("path")
+    command.set_defaults(func=cmd_export)
+
+    command = commands.add_parser("batch", help="run a file of commands in one transaction")
+    command.add_argument("path")
+    command.set_defaults(func=cmd_batch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = Database(args.db)
+    try:
+        db.migrate()
+        report = args.func(db, args)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    report()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Item and sale operations shared by the Tk application and the command line
+
+Nothing here imports tkinter. Every function takes a Database, validates its
+input, raises ValueError with a message fit for the user, and does its writes
+in one transaction. Called inside an outer transaction the writes become a
+savepoint of it, so a batch of operations commits or rolls back as a whole.
+
+Items are edited and deleted one row at a time by items.id; item_code is
+not unique and never selects rows to write. Writes take the write lock up
+front (BEGIN IMMEDIATE), so the checks they make still hold when they
+write. An edit prepared from a row read earlier passes the version it saw;
+if another till wrote that row in between, ConflictError is raised and
+nothing is written.
+"""
+import operator
+import sqlite3
+from datetime import date, datetime, timedelta
+
+from database import ITEM_COLUMNS
+from receipt import Receipt
+from sales import record_sale
+from stock import movements, on_hand, record_movement
+
+# Position of each ITEM_COLUMNS column in an items row
+ITEM_FIELD_INDEX = {column.strip(): index for index, column in enumerate(ITEM_COLUMNS.split(","))}
+# The operators filter_conditions produces
+COMPARISONS = {"=": operator.eq, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+
+class ConflictError(ValueError):
+    """The rows changed in the database since the caller read them"""
+
+
+def get_item(db, item_id, expected_version=None):
+    """Return the items row with this id, checking it is still the version the caller saw"""
+    row = db.query_one(f"SELECT {ITEM_COLUMNS} FROM items WHERE id=?", (item_id,))
+    if row is None:
+        if expected_version is not None:
+            raise ConflictError("This item was deleted at another till. The list has been reloaded.")
+        raise ValueError(f"No item with id {item_id}")
+    if expected_version is not None and row[6] != expected_version:
+        raise ConflictError("This item was changed at another till. The list has been reloaded, please try again.")
+    return row
+
+
+def parse_item(item_code, product_code, item_name, selling_price):
+    """Strip and validate item fields; returns them with the price as a float"""
+    item_code = str(item_code).strip()
+    product_code = str(product_code).strip()
+    item_name = str(item_name).strip()
+    selling_price = str(selling_price).strip()
+    if not (item_code and product_code and item_name and selling_price):
+        raise ValueError("All fields are required")
+    try:
+        price = float(selling_price)
+    except ValueError:
+        price = -1
+    if price < 0:
+        raise ValueError("Selling price must be a positive number")
+    return item_code, product_code, item_name, price
+
+
+def find_item(db, code):
+    """Return the items row for a product code, or the first with that item code"""
+    return (db.query_one(f"SELECT {ITEM_COLUMNS} FROM items WHERE product_code=?", (code,))
+            or db.query_one(f"SELECT {ITEM_COLUMNS} FROM items WHERE item_code=? ORDER BY id LIMIT 1", (code,)))
+
+
+def add_item(db, item_code, product_code, item_name, selling_price):
+    """Insert a new item and return its row"""
+    item_code, product_code, item_name, selling_price = parse_item(item_code, product_code, item_name, selling_price)
+    current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        with db.transaction(immediate=True) as cursor:
+            cursor.execute(
+                "INSERT INTO items (item_code, product_code, item_name, selling_price, date_added) VALUES (?, ?, ?, ?, ?)",
+                (item_code, product_code, item_name, selling_price, current_date)
+            )
+            return (cursor.lastrowid, item_code, product_code, item_name, selling_price, current_date, 1)
+    except sqlite3.IntegrityError:
+        # The UNIQUE constraint settles two tills adding the same product code
+        raise ValueError("Product code already exists") from None
+
+
+def update_item(db, item_id, item_code, product_code, item_name, selling_price, expected_version=None):
+    """Update the item with this id; returns (old_row, new_row)
+
+    expected_version is the version of the row the edit was made from.
+    """
+    item_code, product_code, item_name, selling_price = parse_item(item_code, product_code, item_name, selling_price)
+    try:
+        with db.transaction(immediate=True) as cursor:
+            old_row = get_item(db, item_id, expected_version)
+            cursor.execute(
+                "UPDATE items SET item_code=?, product_code=?, item_name=?, selling_price=?, version=version + 1 "
+                "WHERE id=?",
+                (item_code, product_code, item_name, selling_price, item_id)
+            )
+    except sqlite3.IntegrityError:
+        raise ValueError("Product code already exists") from None
+    return old_row, (item_id, item_code, product_code, item_name, selling_price, old_row[5], old_row[6] + 1)
+
+
+def delete_item(db, item_id, expected_version=None):
+    """Delete the item with this id and return its row
+
+    expected_version is the version of the row the user chose to delete.
+    """
+    with db.transaction(immediate=True) as cursor:
+        old_row = get_item(db, item_id, expected_version)
+        cursor.execute("DELETE FROM items WHERE id=?", (item_id,))
+    return old_row
+
+
+def prefix_range(prefix):
+    """(low, high) such that low <= text < high holds for exactly the texts starting with prefix
+
+    A range keeps prefix matching on the plain (BINARY) column indexes,
+    which LIKE could only use with case_sensitive_like on.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def day_text(day):
+    """A date or "YYYY-MM-DD" as the date_added prefix it compares against"""
+    if isinstance(day, str):
+        try:
+            day = date.fromisoformat(day.strip())
+        except ValueError:
+            raise ValueError(f"Cannot read {day!r} as a YYYY-MM-DD date") from None
+    return day.isoformat()
+
+
+def parse_price(price):
+    """A price filter as a float"""
+    try:
+        return float(price)
+    except ValueError:
+        raise ValueError(f"Cannot read {price!r} as a price") from None
+
+
+def filter_conditions(item_code="", product_code="", item_name="", selling_price=None, *, item_code_prefix="",
+                      product_code_prefix="", item_name_prefix="", min_price=None, max_price=None, added_from=None,
+                      added_to=None):
+    """[(column, operator, value)] that every row search_items returns satisfies
+
+    Empty filters ("" or None) are left out. Each filter becomes an equality
+    or a range on a single column, so the query can seek the composite
+    indexes on items (see migration 12).
+    """
+    conditions = []
+    for column, value in (("item_code", item_code), ("product_code", product_code), ("item_name", item_name),
+                          ("selling_price", selling_price)):
+        if value not in ("", None):
+            conditions.append((column, "=", value))
+    for column, prefix in (("item_code", item_code_prefix), ("product_code", product_code_prefix),
+                           ("item_name", item_name_prefix)):
+        if prefix:
+            low, high = prefix_range(prefix)
+            conditions += [(column, ">=", low), (column, "<", high)]
+    if min_price not in ("", None):
+        conditions.append(("selling_price", ">=", parse_price(min_price)))
+    if max_price not in ("", None):
+        conditions.append(("selling_price", "<=", parse_price(max_price)))
+    # date_added is "YYYY-MM-DD HH:MM:SS"; both ends of the day range are inclusive
+    if added_from:
+        conditions.append(("date_added", ">=", day_text(added_from)))
+    if added_to:
+        conditions.append(("date_added", "<", (date.fromisoformat(day_text(added_to)) + timedelta(days=1)).isoformat()))
+    return conditions
+
+
+def compile_filters(**filters):
+    """WHERE clause and parameters for search_items; every value is a bound parameter"""
+    conditions = filter_conditions(**filters)
+    where = " AND ".join(f"{column} {operator} ?" for column, operator, value in conditions)
+    return where or "1=1", [value for column, operator, value in conditions]
+
+
+def row_matches(row, conditions):
+    """Whether an items row satisfies filter_conditions, compared the way SQLite compares them"""
+    return all(COMPARISONS[operator](row[ITEM_FIELD_INDEX[column]], value) for column, operator, value in conditions)
+
+
+def search_sql(limit=-1, **filters):
+    """(sql, params) of the search_items query"""
+    where, params = compile_filters(**filters)
+    return f"SELECT {ITEM_COLUMNS} FROM items WHERE {where} ORDER BY id LIMIT ?", params + [limit]
+
+
+def search_items(db, item_code="", product_code="", item_name="", selling_price=None, limit=-1, **ranges):
+    """Rows matching every given filter, in id order; limit=-1 returns them all
+
+    ranges are the prefix and range filters of filter_conditions.
+    """
+    sql, params = search_sql(limit, item_code=item_code, product_code=product_code, item_name=item_name,
+                             selling_price=selling_price, **ranges)
+    return db.query_all(sql, params)
+
+
+def explain_search(db, **filters):
+    """EXPLAIN QUERY PLAN details of the search_items query for these filters"""
+    sql, params = search_sql(**filters)
+    return [row[-1] for row in db.query_all(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def sell(db, codes, sold_at=None):
+    """Record a sale of [(code, quantity)]; returns (receipt, sale_id, bill_no)
+
+    Codes are looked up like a barcode scan: product code first, then item
+    code. The lookups and the ledger write share one transaction.
+    """
+    receipt = Receipt()
+    with db.transaction(immediate=True):
+        for code, quantity in codes:
+            if quantity <= 0:
+                raise ValueError(f"Quantity for {code} must be positive")
+            row = find_item(db, code)
+            if row is None:
+                raise ValueError(f"No item with code {code}")
+            receipt.add(row, quantity)
+        if not receipt:
+            raise ValueError("Cart is empty")
+        sale_id, bill_no = record_sale(db, receipt, sold_at)
+    return receipt, sale_id, bill_no
+
+
+def parse_quantity(quantity, allow_negative=False):
+    """Validate a whole-number stock quantity"""
+    try:
+        quantity = int(str(quantity).strip())
+    except ValueError:
+        raise ValueError("Quantity must be a whole number") from None
+    if quantity == 0:
+        raise ValueError("Quantity cannot be zero")
+    if quantity < 0 and not allow_negative:
+        raise ValueError("Quantity must be positive")
+    return quantity
+
+
+def move_stock(db, code, kind, quantity, note=None):
+    """Journal a receipt or adjustment for the item with this code; returns (row, on_hand)"""
+    quantity = parse_quantity(quantity, allow_negative=kind == "adjustment")
+    with db.transaction(immediate=True):
+        row = find_item(db, code)
+        if row is None:
+            raise ValueError(f"No item with code {code}")
+        return row, record_movement(db, row[0], kind, quantity, note=note)
+
+
+def receive_stock(db, code, quantity, note=None):
+    """Add delivered units to an item's stock; returns (row, on_hand)"""
+    return move_stock(db, code, "receipt", quantity, note)
+
+
+def adjust_stock(db, code, quantity, note=None):
+    """Correct an item's stock by a signed quantity; returns (row, on_hand)"""
+    return move_stock(db, code, "adjustment", quantity, note)
+
+
+def stock_level(db, code, limit=20):
+    """Return (row, on_hand, latest movements) for the item with this code"""
+    row = find_item(db, code)
+    if row is None:
+        raise ValueError(f"No item with code {code}")
+    return row, on_hand(db, row[0]), movements(db, row[0], limit)
+
+
+def daily_totals(db, day):
+    """Return (bills, items, subtotal_cents, tax_cents, total_cents) sold on a date"""
+    row = db.query_one("SELECT bills, units, subtotal_cents, tax_cents, total_cents FROM sales_daily WHERE day=?",
+                       (day.isoformat(),))
+    return row or (0, 0, 0, 0, 0)
@@ -1,36 +1,77 @@
+# Taken before the other imports so the startup timings include them
+import time
+STARTED = time.perf_counter()
+
 import tkinter as tk
-from tkinter import ttk, messagebox, PhotoImage
-import sqlite3
+from tkinter import ttk, messagebox as tk_messagebox, filedialog as tk_filedialog, PhotoImage
 from datetime import datetime
+from types import SimpleNamespace
+import json
 import os
+import sys
+import inventory_core
+from catalog import (CatalogCache, CatalogView, build_catalog, category_view, load_categories, search_tokens,
+                     search_view, text_matches, text_search)
+from catalog_csv import export_file, import_file
+from database import DB_PATH
+from db_worker import DBWorker
+from metrics import METRICS, enable_slow_log
+from receipt import Receipt
+from reports import UNCATEGORIZED, category_totals, daily_revenue, date_range, item_totals, weekly_revenue
+from sales import format_bill, record_sale, save_bill
+from stock import on_hand
+from virtual_tree import VirtualTreeview
+
+# Dialogs wait on the user, so their time is left out of the handler timings
+messagebox = SimpleNamespace(**{name: METRICS.untimed(getattr(tk_messagebox, name))
+                                for name in ("showinfo", "showerror", "askyesno")})
+filedialog = SimpleNamespace(**{name: METRICS.untimed(getattr(tk_filedialog, name))
+                                for name in ("askopenfilename", "asksaveasfilename")})
+
+METRICS_FILE = "metrics.json"
+SLOW_LOG_FILE = "slow_operations.log"
+
+
+def create_database(db):
+    """Bring inventory.db up to the current schema version and read the catalog (worker thread)"""
+    db.migrate()
+    categories = load_categories(db)
+    return categories, build_catalog(db, categories)
+
 
+@METRICS.instrument("ui")
 class InventoryManagementSystem:
+    # Pause after the last keystroke before the search box queries
+    QUICK_SEARCH_DELAY_MS = 150
+    # Most matches the search box shows; short prefixes can hit most of the catalog
+    QUICK_SEARCH_LIMIT = 1000
+    # How often an open diagnostics window re-reads the counters
+    DIAGNOSTICS_REFRESH_MS = 1000
+    # Report screen: (heading, width) per column of each report
+    REPORT_COLUMNS = {
+        "daily": (("Day", 110), ("Bills", 70), ("Units", 70), ("Subtotal", 110), ("Tax", 100), ("Total", 110)),
+        "weekly": (("Week of", 110), ("Bills", 70), ("Units", 70), ("Subtotal", 110), ("Tax", 100), ("Total", 110)),
+        "items": (("Product Code", 110), ("Item Code", 110), ("Item Name", 260), ("Units", 70), ("Revenue", 110)),
+        "categories": (("Category", 260), ("Units", 70), ("Revenue", 110)),
+    }
+    
     def __init__(self, root):
         self.root = root
         self.root.title("CIB Inventory Management System")
         self.root.geometry("1080x720")
         self.root.configure(bg="#f0f0f0")
 
-        # Get the directory of the executable or script
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-
-        # Load images
-        try:
-            self.employee_img = PhotoImage(file=os.path.join(base_dir, "images", "employee_icon.png"))
-            self.database_img = PhotoImage(file=os.path.join(base_dir, "images", "database_icon.png"))
-            self.item_img = PhotoImage(file=os.path.join(base_dir, "images", "item_icon.png"))
-            self.logout_img = PhotoImage(file=os.path.join(base_dir, "images", "logout_icon.png"))
-            self.login_image = PhotoImage(file=os.path.join(base_dir, "images", "login_icon.png"))
-        except:
-            # Create blank images if actual images aren't found
-            self.employee_img = PhotoImage(width=48, height=48)
-            self.database_img = PhotoImage(width=48, height=48)
-            self.item_img = PhotoImage(width=48, height=48)
-            self.logout_img = PhotoImage(width=48, height=48)
-            self.login_image = PhotoImage(width=48, height=48)
-        
-        # Initialize database
-        self.create_database()
+        # Icons are read from the images folder on first use
+        self.icons = {}
+        self.login_background = None
+        
+        # Every query runs on the worker's own connection; migrations run there after the first paint
+        self.db_path = DB_PATH
+        self.database_ready = False
+        # The exception that stopped the database from opening, if any
+        self.database_error = None
+        # Set by --startup-time: close as soon as the login screen is usable
+        self.exit_when_ready = False
         
         # Variables for login
         self.username_var = tk.StringVar()
@@ -48,136 +89,120 @@ class InventoryManagementSystem:
         self.item_name_dropdown_var = tk.StringVar()
         self.selling_price_dropdown_var = tk.StringVar()
         
+        # Prefix and range filters, keyed by their inventory_core.search_items argument
+        self.filter_vars = {name: tk.StringVar() for name in (
+            "item_code_prefix", "product_code_prefix", "item_name_prefix", "min_price", "max_price", "added_from",
+            "added_to")}
+        
         # Variable for category selection
         self.selected_category = tk.StringVar()
         
-        # Define categories and their items
-        self.categories = {
-            "LADIES 2FOLD": [
-                "2 FOLD BLACK", "2 FOLD SATIN", "2 FOLD BLACK UV",
-                "2 FOLD PLAIN COLOUR WITH PRINT", "2 FOLD PLAIN BORDER DESIGN",
-                "2 FOLD PRINTED UV", "2 FOLD PRINTED FRIELD UMBRELLA",
-                "2 FOLD BLACK HALF MOON"
-            ],
-            "LADIES 3 FOLD": [
-                "3 FOLD BLACK", "3 FOLD PRINTED", "3 FOLD SATIN",
-                "3 FOLD BLACK UV", "3 FOLD PLAIN COLOUR WITH PRINT",
-                "3 FOLD PLAIN BORDER DESIGN", "3 FOLD UV PRINTED",
-                "3 FOLD PRINTED FRIELD UMBRELLA", "3 FOLD BLACK HALF MOON"
-            ],
-            "24\" GENTS": [
-                "24*16 GOLD METAL FRAME MANUAL OPEN BLACK",
-                "24*16 GOLD METAL FRAME MANUAL OPEN MULTI",
-                "24*16 GOLD METAL FRAME MANUAL OPEN SILVER",
-                "24*16 MANUAL OPEN TELESCOPE (MULTI)"
-            ],
-            "27\" GENTS": [
-                "27*16 GOLD METAL FRAME MANUAL OPEN BLACK",
-                "27*16 GOLD METAL FRAME MANUAL OPEN MULTI",
-                "27*16 GOLD METAL FRAME MANUAL OPEN UV",
-                "27*16 MANUAL OPEN TELESCOPE (MULTI)",
-                "27*16 METAL FRAME MULTI-SIXTY PANNEL"
-            ],
-            "30\" GENTS": [
-                "30*16 GOLD METAL FRAME MANUAL OPEN PLAIN",
-                "30*16 GOLD METAL FRAME MANUAL OPEN MULTI",
-                "30*16 GOLD METAL FRAME MANUAL OPEN UV",
-                "30*16 METAL FRAME MULTI-SIXTY PANNEL"
-            ],
-            "MUTHU UMBRELLA": [
-                "NORMAL MUTHU UMBRELLA WHITE", "NORMAL MUTHU UMBRELLA YELLOW",
-                "NORMAL FRILED WITH RIB COVER WHITE", "NORMAL FRILED WITH RIB COVER YELLOW",
-                "SEAQUEENS FRILED WITH RIB COVER WHITE", "SEAQUEENS FRILED WITH RIB COVER YELLOW",
-                "DESIGN FRILED WITH RIB COVER YELLOW", "DESIGN FRILED WITH RIB COVER WHITE",
-                "NORMAL MUTHU UMBRELLA WHITE SIXTY PANNEL", "NORMAL MUTHU UMBRELLA YELLOW SIXTY PANNEL"
-            ],
-            "CAR UMBRELLA": ["CAR UMBRELLA"],
-            "GARDEN UMBRELLA": [
-                "36*8 GARDEN UMBRELLA", "44*16 GARDEN UMBRELLA",
-                "44*16 GARDEN UMBRELLA SIXTY PANNEL"
-            ],
-            "BABY UMBRELLA": [
-                "BABY PLAIN", "BABY PRINTED", "BABY TELESCOPE UMBRELLA"
-            ],
-            "PIRIKARA UMBRELLA": [
-                "2 FOLD (BLACK)", "2 FOLD (BROWN)", "2 FOLD (ORANGE)",
-                "2 FOLD (YELLOW)", "2 FOLD (MEROON)", "24*16 MANUAL PIRIKARA (BLACK)",
-                "24*16 MANUAL PIRIKARA (BROWN)", "24*16 MANUAL PIRIKARA (ORANGE)",
-                "24*16 MANUAL PIRIKARA (MEROON)", "24*16 MANUAL PIRIKARA (YELLOW)"
-            ],
-            "MOSQUITO NETS": [
-                "SR-NORMAL NETS SMALL", "SR-NORMAL NETS MEDIUM",
-                "SR-NORMAL NETS LARGE", "SR-NORMAL NETS EXTRA LARGE"
-            ]
-        }
-
-        # Shopping cart for bill printing
-        self.cart_items = []
+        # Search-as-you-type box and its pending debounce callback
+        self.quick_search_var = tk.StringVar()
+        self.quick_search_var.trace_add("write", self.on_quick_search_changed)
+        self.quick_search_job = None
         
-        # Create frames
-        self.login_frame = tk.Frame(self.root, bg="#f0f0f0")
-        self.main_frame = tk.Frame(self.root, bg="#f0f0f0")
-        self.item_frame = tk.Frame(self.root, bg="#f0f0f0")
+        # Categories and their item names live in the database, loaded at startup
+        self.categories = {}
+        
+        # In-memory catalog that serves the treeviews and dropdowns
+        self.catalog = CatalogCache(self.categories)
         
-        # Start with login frame
+        # Shopping cart for bill printing
+        self.cart = Receipt()
+        
+        # Barcode scan mode: keyboard-wedge input goes straight into the receipt
+        self.scan_mode = tk.BooleanVar(value=False)
+        self.scan_var = tk.StringVar()
+        
+        # Virtual views over self.tree and self.item_tree, created with their frames
+        self.tree_view = None
+        self.item_tree_view = None
+        
+        # Status bar with a progress indicator for background database work
+        self.status_bar = tk.Frame(self.root, bg="#f0f0f0")
+        self.status_bar.pack(side="bottom", fill="x")
+        self.status_label = tk.Label(self.status_bar, text="", font=("Arial", 9), bg="#f0f0f0", fg="#555")
+        self.status_label.pack(side="left", padx=10)
+        self.progress = ttk.Progressbar(self.status_bar, mode="indeterminate", length=120)
+        
+        # Loading, searching and saving run on this thread, off the Tk main loop
+        self.worker = DBWorker(self.root, self.db_path, on_busy=self.on_worker_busy)
+        
+        # Menu bar, shown only while logged in
+        self.create_menu()
+        
+        # Hidden diagnostics window: double-click the sidebar or press Ctrl+Shift+D
+        self.diagnostics_window = None
+        self.root.bind("<Control-Shift-D>", self.show_diagnostics)
+        
+        # Screens are built on their first visit, then only shown, hidden and refreshed
+        self.screen_builders = {"login": self.build_login_frame, "main": self.build_main_frame,
+                                "item": self.build_item_frame, "reports": self.build_reports_frame}
+        self.screens = {}
+        self.current_screen = None
+        # Per screen: the widgets handlers update through self.<name> while it is shown
+        self.screen_widgets = {}
+        
+        # Start with login frame, then prepare the database once it is on screen
         self.show_login_frame()
+        self.root.after_idle(self.on_first_paint)
     
-    def create_database(self):
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            role TEXT NOT NULL
-        )
-        ''')
-        
-        # Create items table with product_code as unique only (removed UNIQUE constraint from item_code)
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            item_code TEXT NOT NULL CHECK(length(item_code) > 0),
-            product_code TEXT UNIQUE NOT NULL CHECK(length(product_code) > 0),
-            item_name TEXT NOT NULL CHECK(length(item_name) > 0),
-            selling_price REAL NOT NULL CHECK(selling_price >= 0),
-            date_added TEXT NOT NULL
-        )
-        ''')
-        
-        # Create default admin user if it doesn't exist
-        cursor.execute("SELECT * FROM users WHERE username='admin'")
-        if not cursor.fetchone():
-            cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
-                          ('admin', 'admin123', 'admin'))
-        
-        # Insert sample items if they don't exist
-        sample_items = [
-            ('100100091', '$2010', '2FOLD BLACK HALF MOON', 950.0, '2025-05-07 17:54:30'),
-            ('100200002', '$2050', '3 FOLD BLACK', 1145.0, '2025-05-07 17:54:30'),
-            ('100200003', '$2051', '3 FOLD PRINTED', 1150.0, '2025-05-07 17:54:30'),
-            ('100200004', '$2052', '3 FOLD SATIN', 1150.0, '2025-05-07 17:54:30'),
-            ('100200005', '$2053', '3 FOLD BLACK UV', 1245.0, '2025-05-07 17:56:33'),
-            ('100400009', '$2135', '27*16 GOLD METAL FRAME MANUAL OPEN BLACK', 1750.0, '2025-05-07 17:54:30'),
-            ('100400010', '$2104', '24*16 GOLD METAL FRAME MANUAL OPEN BLACK', 1570.0, '2025-05-07 17:54:30'),
-            ('100400011', '$2105', '24*16 GOLD METAL FRAME MANUAL OPEN MULTI', 1590.0, '2025-05-07 17:54:30'),
-            ('100400012', '$2106', '24*16 GOLD METAL FRAME MANUAL OPEN SILVER', 1720.0, '2025-05-07 17:54:30'),
-            ('100400163', '$2107', '24*16 MANUAL OPEN TELESCOPE (MULTI)', 1990.0, '2025-05-07 17:54:30')
-        ]
-        
-        for item in sample_items:
+    def icon(self, name):
+        """Return images/<name>_icon.png, loading it on first use"""
+        image = self.icons.get(name)
+        if image is None:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images", f"{name}_icon.png")
             try:
-                cursor.execute("SELECT * FROM items WHERE product_code=?", (item[1],))
-                if not cursor.fetchone():
-                    cursor.execute("INSERT INTO items (item_code, product_code, item_name, selling_price, date_added) VALUES (?, ?, ?, ?, ?)", item)
-            except sqlite3.IntegrityError:
-                continue  # Skip if item already exists
-        
-        conn.commit()
-        conn.close()
+                image = PhotoImage(file=path)
+            except tk.TclError:
+                # Create a blank image if the actual image isn't found
+                image = PhotoImage(width=48, height=48)
+            self.icons[name] = image
+        return image
+    
+    def gradient_image(self, width, height):
+        """Dark-to-light blue login background, rendered once as an image
+
+        One pixel column is filled with a single put() and zoomed to the full
+        width, instead of drawing a canvas line per row.
+        """
+        if self.login_background is None:
+            colors = []
+            for i in range(height):
+                r = int(0 + (100 - 0) * (i / height))
+                g = int(71 + (150 - 71) * (i / height))
+                b = int(179 + (255 - 179) * (i / height))
+                colors.append(f'{{#{r:02x}{g:02x}{b:02x}}}')
+            column = PhotoImage(width=1, height=height)
+            column.put(" ".join(colors), to=(0, 0))
+            self.login_background = column.zoom(width, 1)
+        return self.login_background
+    
+    def on_first_paint(self):
+        """Record time to first paint and start the deferred schema and catalog work"""
+        METRICS.record("startup:first_paint", time.perf_counter() - STARTED)
+        self.run_in_background(create_database, self.on_database_ready, self.on_database_failed,
+                               message="Preparing database...", name="create_database")
+    
+    def on_database_ready(self, result):
+        """Install the categories and catalog; from here on the login screen is interactive"""
+        self.categories, catalog = result
+        self.on_catalog_loaded(catalog)
+        self.database_ready = True
+        METRICS.record("startup:interactive", time.perf_counter() - STARTED)
+        if self.exit_when_ready:
+            self.root.quit()
+    
+    def on_database_failed(self, error):
+        """The schema or catalog could not be prepared, so nobody can log in"""
+        self.database_error = error
+        self.status_label.config(text="The database could not be opened")
+        if self.exit_when_ready:
+            print(f"Error: the database could not be opened: {error}", file=sys.stderr)
+            self.root.quit()
+            return
+        messagebox.showerror("Database Error", f"The database could not be opened:\n{error}")
     
     def logout(self):
         """Handle user logout with confirmation"""
@@ -185,31 +210,59 @@ class InventoryManagementSystem:
         if confirm:
             # Clear all entry fields and variables
             self.clear_fields()
+            self.quick_search_var.set("")
+            self.selected_category.set("")
             # Reset cart items
-            self.cart_items = []
+            self.cart.clear()
+            # The screens are kept, so put their tables back to the full catalog
+            if self.tree_view is not None:
+                self.load_items()
+            if self.item_tree_view is not None:
+                self.load_item_tree()
             # Show login frame
             self.show_login_frame()
     
+    def show_screen(self, name):
+        """Show one screen, building it on its first visit, and hide the current one"""
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = self.screens[name] = self.screen_builders[name]()
+        if self.current_screen is not None and self.current_screen != name:
+            self.screens[self.current_screen].pack_forget()
+        self.current_screen = name
+        for attr, widget in self.screen_widgets.get(name, {}).items():
+            setattr(self, attr, widget)
+        screen.pack(fill="both", expand=True)
+    
+    def refresh_view(self, view, load):
+        """Bring a kept treeview up to date with the catalog without resetting its filter"""
+        if view.source is None:
+            load()
+        elif view.source.is_stale():
+            view.source.rebuild()
+            view.refresh()
+    
     def show_login_frame(self):
-        # Hide all frames
-        self.main_frame.pack_forget()
-        self.item_frame.pack_forget()
+        self.root.config(menu="")
+        self.show_screen("login")
+        
+        # Bind the enter key to Login
+        self.root.bind('<Return>', lambda event: self.login())
         
+        # Set focus to username field
+        self.username_entry.focus_set()
+    
+    def build_login_frame(self):
+        """Build the login screen; called once, on its first visit"""
         # Configure login frame with gradient background
         self.login_frame = tk.Frame(self.root, bg="#0047B3")
-        self.login_frame.pack(fill="both", expand=True)
         
         # Create gradient background
         canvas = tk.Canvas(self.login_frame, width=1080, height=720, highlightthickness=0)
         canvas.pack(fill="both", expand=True)
         
-        # Draw gradient from dark blue to lighter blue
-        for i in range(720):
-            r = int(0 + (100 - 0) * (i / 720))
-            g = int(71 + (150 - 71) * (i / 720))
-            b = int(179 + (255 - 179) * (i / 720))
-            color = f'#{r:02x}{g:02x}{b:02x}'
-            canvas.create_line(0, i, 1080, i, fill=color)
+        # Gradient from dark blue to lighter blue
+        canvas.create_image(0, 0, anchor="nw", image=self.gradient_image(1080, 720))
         
         # Main container for login elements
         login_container = tk.Frame(canvas, bg="white", bd=0, relief="flat")
@@ -224,7 +277,7 @@ class InventoryManagementSystem:
         logo_frame.pack(pady=(30, 20))
         
         # Logo icon
-        logo_icon = tk.Label(logo_frame, image=self.login_image, font=("Arial", 40), bg="white")
+        logo_icon = tk.Label(logo_frame, image=self.icon("login"), font=("Arial", 40), bg="white")
         logo_icon.pack(side="left", padx=10)
         
         # Title text
@@ -244,11 +297,11 @@ class InventoryManagementSystem:
                                 font=("Arial", 10), bg="white", fg="#555", anchor="w")
         username_label.pack(fill="x", pady=(5, 0))
         
-        username_entry = tk.Entry(input_frame, textvariable=self.username_var, 
-                                font=("Arial", 12), bd=1, relief="solid",
-                                highlightthickness=1, highlightcolor="#0047B3",
-                                highlightbackground="#ddd")
-        username_entry.pack(fill="x", pady=5, ipady=8)
+        self.username_entry = tk.Entry(input_frame, textvariable=self.username_var, 
+                                       font=("Arial", 12), bd=1, relief="solid",
+                                       highlightthickness=1, highlightcolor="#0047B3",
+                                       highlightbackground="#ddd")
+        self.username_entry.pack(fill="x", pady=5, ipady=8)
         
         # Password field
         password_label = tk.Label(input_frame, text="Password", 
@@ -283,11 +336,7 @@ class InventoryManagementSystem:
                          font=("Arial", 8), bg="white", fg="#999")
         footer.pack(side="bottom", pady=10)
         
-        # Bind the enter key to Login
-        self.root.bind('<Return>', lambda event: self.login())
-        
-        # Set focus to username field
-        username_entry.focus_set()
+        return self.login_frame
     
     def login(self):
         username = self.username_var.get()
@@ -297,30 +346,42 @@ class InventoryManagementSystem:
             messagebox.showerror("Error", "Both username and password are required")
             return
         
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
+        if self.database_error is not None:
+            messagebox.showerror("Database Error", f"The database could not be opened:\n{self.database_error}")
+            return
         
-        cursor.execute("SELECT * FROM users WHERE username=? AND password=?", (username, password))
-        user = cursor.fetchone()
+        if not self.database_ready:
+            self.status_label.config(text="Still preparing the database, try again in a moment")
+            return
         
-        conn.close()
+        def on_checked(user):
+            if user:
+                self.username_var.set("")
+                self.password_var.set("")
+                self.show_main_frame()
+            else:
+                messagebox.showerror("Error", "Invalid username or password")
         
-        if user:
-            self.username_var.set("")
-            self.password_var.set("")
-            self.show_main_frame()
-        else:
-            messagebox.showerror("Error", "Invalid username or password")
+        self.run_in_background(
+            lambda db: db.query_one("SELECT 1 FROM users WHERE username=? AND password=?", (username, password)),
+            on_checked, channel="login", message="Signing in...", name="login")
 
     def show_main_frame(self):
         """Show the main application frame"""
-        # Hide other frames
-        self.login_frame.pack_forget()
-        self.item_frame.pack_forget()
+        self.root.unbind('<Return>')
+        self.root.config(menu=self.menubar)
+        self.show_screen("main")
         
+        # Only the data changes between visits
+        self.refresh_view(self.tree_view, self.load_items)
+        self.update_cart_count()
+        if self.scan_mode.get():
+            self.scan_entry.focus_set()
+    
+    def build_main_frame(self):
+        """Build the main screen; called once, on its first visit"""
         # Configure main frame
         self.main_frame = tk.Frame(self.root, bg="#f0f0f0")
-        self.main_frame.pack(fill="both", expand=True)
         
         # Create sidebar
         self.create_sidebar(self.main_frame)
@@ -404,15 +465,15 @@ class InventoryManagementSystem:
         self.tree.column("selling_price", width=100)
         self.tree.column("date_added", width=150)
         
-        # Bind the treeview select event
-        self.tree.bind('<<TreeviewSelect>>', self.on_item_select)
-        
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Add scrollbar; the virtual view only materializes the visible rows
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical")
+        self.tree_view = VirtualTreeview(self.tree, scrollbar)
         scrollbar.pack(side="right", fill="y")
         self.tree.pack(fill="both", expand=True)
         
+        # Bind the treeview select event
+        self.tree.bind('<<TreeviewSelect>>', self.on_item_select, add="+")
+        
         # Cart section
         cart_frame = tk.Frame(container, bg="#f0f0f0")
         cart_frame.pack(fill="x", padx=10, pady=(0, 10))
@@ -431,6 +492,9 @@ class InventoryManagementSystem:
                                    command=self.add_to_cart, cursor="hand2")
         add_to_cart_btn.pack(side="right", padx=10)
         
+        # Barcode scanning
+        self.create_scan_bar(container, padx=10, pady=(0, 10))
+        
         # Action buttons frame
         buttons_container = tk.Frame(container, bg="#f0f0f0")
         buttons_container.pack(fill="x", padx=10, pady=10)
@@ -459,18 +523,26 @@ class InventoryManagementSystem:
                              command=self.print_bill, cursor="hand2")
         print_btn.grid(row=1, column=1, pady=5, padx=5)
         
-        # Load items
-        self.load_items()
+        self.screen_widgets["main"] = {"cart_count_label": self.cart_count_label, "scan_entry": self.scan_entry,
+                                       "scan_status_label": self.scan_status_label}
+        return self.main_frame
     
     def show_item_frame(self):
         """Show the Item Management frame with dropdown menus and category radio buttons"""
-        # Hide other frames
-        self.main_frame.pack_forget()
-        self.login_frame.pack_forget()
+        self.root.unbind('<Return>')
+        self.root.config(menu=self.menubar)
+        self.show_screen("item")
         
+        # Only the data changes between visits
+        self.refresh_view(self.item_tree_view, self.load_item_tree)
+        self.update_cart_count()
+        if self.scan_mode.get():
+            self.scan_entry.focus_set()
+    
+    def build_item_frame(self):
+        """Build the Item Management screen; called once, on its first visit"""
         # Configure item frame
         self.item_frame = tk.Frame(self.root, bg="#f0f0f0")
-        self.item_frame.pack(fill="both", expand=True)
         
         # Create sidebar
         self.create_sidebar(self.item_frame)
@@ -500,6 +572,12 @@ class InventoryManagementSystem:
         left_frame = tk.Frame(main_content_frame, bg="#f0f0f0")
         left_frame.pack(side="left", fill="y", padx=5, pady=5)
         
+        # Search-as-you-type box over item names and codes
+        quick_search_frame = tk.LabelFrame(left_frame, text="Quick Search", bg="#f0f0f0", font=("Arial", 10, "bold"))
+        quick_search_frame.pack(fill="x", padx=5, pady=5)
+        quick_search_entry = tk.Entry(quick_search_frame, textvariable=self.quick_search_var, width=30)
+        quick_search_entry.pack(fill="x", padx=5, pady=5)
+        
         # Category selection frame (radio buttons)
         category_frame = tk.LabelFrame(left_frame, text="Categories", bg="#f0f0f0", font=("Arial", 10, "bold"))
         category_frame.pack(fill="x", padx=5, pady=5)
@@ -551,14 +629,30 @@ class InventoryManagementSystem:
         self.selling_price_dropdown.grid(row=3, column=1, padx=5, pady=5, sticky="w")
         self.selling_price_dropdown.bind("<<ComboboxSelected>>", self.on_dropdown_select)
         
+        # Prefix and range filters, answered by the database's indexes
+        for row, (label, name) in enumerate((("Item Code Starts:", "item_code_prefix"),
+                                              ("Product Code Starts:", "product_code_prefix"),
+                                              ("Item Name Starts:", "item_name_prefix")), start=4):
+            tk.Label(dropdown_frame, text=label, bg="#f0f0f0").grid(row=row, column=0, padx=5, pady=2, sticky="e")
+            tk.Entry(dropdown_frame, textvariable=self.filter_vars[name], width=23).grid(
+                row=row, column=1, padx=5, pady=2, sticky="w")
+        
+        for row, (label, low, high) in enumerate((("Price Min/Max:", "min_price", "max_price"),
+                                                  ("Added From/To:", "added_from", "added_to")), start=7):
+            tk.Label(dropdown_frame, text=label, bg="#f0f0f0").grid(row=row, column=0, padx=5, pady=2, sticky="e")
+            range_frame = tk.Frame(dropdown_frame, bg="#f0f0f0")
+            range_frame.grid(row=row, column=1, padx=5, pady=2, sticky="w")
+            tk.Entry(range_frame, textvariable=self.filter_vars[low], width=11).pack(side="left")
+            tk.Entry(range_frame, textvariable=self.filter_vars[high], width=11).pack(side="left", padx=(2, 0))
+        
         # Search and Clear buttons
         search_btn = tk.Button(dropdown_frame, text="Search", bg="#5271FF", fg="white", 
                               command=self.search_items, cursor="hand2", width=10)
-        search_btn.grid(row=4, column=0, padx=5, pady=10, sticky="e")
+        search_btn.grid(row=9, column=0, padx=5, pady=10, sticky="e")
         
         clear_search_btn = tk.Button(dropdown_frame, text="Clear Search", bg="#FF5252", fg="white", 
                                     command=self.clear_item_search, cursor="hand2", width=10)
-        clear_search_btn.grid(row=4, column=1, padx=5, pady=10, sticky="w")
+        clear_search_btn.grid(row=9, column=1, padx=5, pady=10, sticky="w")
         
         # Right side frame for the treeview
         right_frame = tk.Frame(main_content_frame, bg="#f0f0f0")
@@ -584,9 +678,9 @@ class InventoryManagementSystem:
         self.item_tree.column("selling_price", width=100)
         self.item_tree.column("date_added", width=150)
         
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.item_tree.yview)
-        self.item_tree.configure(yscrollcommand=scrollbar.set)
+        # Add scrollbar; the virtual view only materializes the visible rows
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical")
+        self.item_tree_view = VirtualTreeview(self.item_tree, scrollbar)
         scrollbar.pack(side="right", fill="y")
         self.item_tree.pack(fill="both", expand=True)
         
@@ -608,75 +702,224 @@ class InventoryManagementSystem:
                                    command=self.add_to_cart, cursor="hand2")
         add_to_cart_btn.pack(side="right", padx=10)
         
+        # Barcode scanning
+        self.create_scan_bar(right_frame, pady=(10, 0))
+        
         # Print button
         print_btn = tk.Button(right_frame, text="Print Receipt", bg="#5271FF", fg="white", 
                              width=15, height=2, font=("Arial", 10, "bold"), 
                              command=self.print_bill, cursor="hand2")
         print_btn.pack(pady=10)
         
-        # Load all items initially
-        self.load_item_tree()   
+        self.screen_widgets["item"] = {"cart_count_label": self.cart_count_label, "scan_entry": self.scan_entry,
+                                       "scan_status_label": self.scan_status_label}
+        return self.item_frame
+    
+    def show_reports_frame(self):
+        """Show the sales reports screen with a fresh report"""
+        self.root.unbind('<Return>')
+        self.root.config(menu=self.menubar)
+        self.show_screen("reports")
+        self.load_report()
+    
+    def build_reports_frame(self):
+        """Build the sales reports screen; called once, on its first visit"""
+        self.reports_frame = tk.Frame(self.root, bg="#f0f0f0")
+        
+        # Create sidebar
+        self.create_sidebar(self.reports_frame)
+        
+        # Main content area
+        content_frame = tk.Frame(self.reports_frame, bg="#f0f0f0")
+        content_frame.pack(side="right", fill="both", expand=True, padx=20, pady=20)
+        
+        # Title
+        title_label = tk.Label(content_frame, text="CIB inventory management system - Reports",
+                              font=("Arial", 20, "bold"), fg="white", bg="#0047B3")
+        title_label.pack(fill="x", pady=(0, 20))
+        
+        db_title = tk.Label(content_frame, text="Sales Reports", font=("Arial", 14), fg="white", bg="#0047B3")
+        db_title.pack(fill="x", pady=(0, 10))
+        
+        # Content container
+        container = tk.Frame(content_frame, bg="#f0f0f0", relief="ridge", bd=1)
+        container.pack(fill="both", expand=True)
+        
+        # Date range and report choice
+        start, end = date_range()
+        self.report_start_var = tk.StringVar(value=start)
+        self.report_end_var = tk.StringVar(value=end)
+        self.report_kind = tk.StringVar(value="daily")
+        
+        controls = tk.Frame(container, bg="#f0f0f0")
+        controls.pack(fill="x", padx=10, pady=10)
+        tk.Label(controls, text="From:", bg="#f0f0f0").pack(side="left")
+        tk.Entry(controls, textvariable=self.report_start_var, width=12).pack(side="left", padx=5)
+        tk.Label(controls, text="To:", bg="#f0f0f0").pack(side="left")
+        tk.Entry(controls, textvariable=self.report_end_var, width=12).pack(side="left", padx=5)
+        for kind, text in (("daily", "Daily"), ("weekly", "Weekly"), ("items", "Items"), ("categories", "Categories")):
+            tk.Radiobutton(controls, text=text, variable=self.report_kind, value=kind, command=self.load_report,
+                           bg="#f0f0f0").pack(side="left", padx=5)
+        tk.Button(controls, text="Show", bg="#0047B3", fg="white", width=10,
+                  command=self.load_report).pack(side="right", padx=5)
+        
+        # Report table, its columns change with the report
+        tree_frame = tk.Frame(container)
+        tree_frame.pack(fill="both", expand=True, padx=10)
+        self.report_tree = ttk.Treeview(tree_frame, show="headings", height=15)
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.report_tree.yview)
+        self.report_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.report_tree.pack(fill="both", expand=True)
+        
+        self.report_total_label = tk.Label(container, text="", font=("Arial", 12, "bold"), bg="#f0f0f0", anchor="e")
+        self.report_total_label.pack(fill="x", padx=10, pady=10)
+        
+        return self.reports_frame
+    
+    def load_report(self):
+        """Read the chosen report from the sales rollups on the worker thread"""
+        kind = self.report_kind.get()
+        try:
+            start = datetime.strptime(self.report_start_var.get().strip(), "%Y-%m-%d").date().isoformat()
+            end = datetime.strptime(self.report_end_var.get().strip(), "%Y-%m-%d").date().isoformat()
+        except ValueError:
+            messagebox.showerror("Error", "Dates must be written as YYYY-MM-DD")
+            return
+        
+        read = {"daily": daily_revenue, "weekly": weekly_revenue, "items": item_totals,
+                "categories": category_totals}[kind]
+        self.run_in_background(lambda db: read(db, start, end), lambda rows: self.show_report(kind, rows),
+                               channel="report", message="Loading report...", name="load_report")
+    
+    def show_report(self, kind, rows):
+        """Fill the report table; money columns are stored in cents"""
+        columns = self.REPORT_COLUMNS[kind]
+        self.report_tree.delete(*self.report_tree.get_children())
+        self.report_tree["columns"] = [str(index) for index in range(len(columns))]
+        for index, (heading, width) in enumerate(columns):
+            self.report_tree.heading(str(index), text=heading)
+            self.report_tree.column(str(index), width=width, anchor="w" if index == 0 or heading == "Item Name" else "e")
+        
+        # The last column is always revenue; daily and weekly also carry subtotal and tax
+        money = 3 if kind in ("daily", "weekly") else len(columns) - 1
+        for row in rows:
+            values = list(row)
+            if kind == "categories":
+                values[0] = values[0] or UNCATEGORIZED
+            values[money:] = [f"{cents / 100:.2f}" for cents in values[money:]]
+            self.report_tree.insert("", "end", values=values)
+        
+        revenue = sum(row[-1] for row in rows)
+        units = sum(row[2] if kind in ("daily", "weekly") else row[-2] for row in rows)
+        self.report_total_label.config(text=f"{units} units    Rs:{revenue / 100:.2f}")
+    
+    def create_menu(self):
+        """Create the menu bar with the catalog import/export entries"""
+        self.menubar = tk.Menu(self.root)
+        file_menu = tk.Menu(self.menubar, tearoff=0)
+        file_menu.add_command(label="Import Items from CSV...", command=self.import_items_csv)
+        file_menu.add_command(label="Export Items to CSV...", command=self.export_items_csv)
+        self.menubar.add_cascade(label="File", menu=file_menu)
     
     def create_sidebar(self, parent_frame):
         """Create the sidebar with navigation buttons"""
         sidebar_frame = tk.Frame(parent_frame, bg="#0047B3", width=70)
         sidebar_frame.pack(side="left", fill="y")
+        sidebar_frame.bind("<Double-Button-1>", self.show_diagnostics)
         
         # Sidebar buttons
-        employee_btn = tk.Button(sidebar_frame, image=self.employee_img, bg="#0047B3",
+        employee_btn = tk.Button(sidebar_frame, image=self.icon("employee"), bg="#0047B3",
                                relief="flat", command=self.show_main_frame, cursor="hand2")
         employee_btn.pack(pady=(20, 10), padx=10)
         employee_label = tk.Label(sidebar_frame, text="Employee", font=("Arial", 10), bg="#0047B3", fg="white")
         employee_label.pack()
         
-        database_btn = tk.Button(sidebar_frame, image=self.database_img, bg="#0047B3",
+        database_btn = tk.Button(sidebar_frame, image=self.icon("database"), bg="#0047B3",
                                relief="flat", command=self.show_main_frame, cursor="hand2")
         database_btn.pack(pady=(20, 10), padx=10)
         database_label = tk.Label(sidebar_frame, text="Database", font=("Arial", 10), bg="#0047B3", fg="white")
         database_label.pack()
         
-        item_btn = tk.Button(sidebar_frame, image=self.item_img, bg="#0047B3",
+        item_btn = tk.Button(sidebar_frame, image=self.icon("item"), bg="#0047B3",
                            relief="flat", command=self.show_item_frame, cursor="hand2")
         item_btn.pack(pady=(30, 15), padx=10)
         item_label = tk.Label(sidebar_frame, text="Item", font=("Arial", 10), bg="#0047B3", fg="white")
         item_label.pack()
         
+        reports_btn = tk.Button(sidebar_frame, text="Σ", font=("Arial", 20, "bold"), bg="#0047B3", fg="white",
+                                activebackground="#0047B3", relief="flat", command=self.show_reports_frame,
+                                cursor="hand2")
+        reports_btn.pack(pady=(30, 5), padx=10)
+        reports_label = tk.Label(sidebar_frame, text="Reports", font=("Arial", 10), bg="#0047B3", fg="white")
+        reports_label.pack()
+        
         # Log out button
-        logout_btn = tk.Button(sidebar_frame, image=self.logout_img, bg="#0047B3",
+        logout_btn = tk.Button(sidebar_frame, image=self.icon("logout"), bg="#0047B3",
                              relief="flat", command=self.logout, cursor="hand2")
         logout_btn.pack(pady=(30, 15), padx=10)
         logout_label = tk.Label(sidebar_frame, text="Log out", font=("Arial", 10), bg="#0047B3", fg="white")
         logout_label.pack()
     
+    def create_scan_bar(self, parent_frame, **pack_options):
+        """Create the barcode entry that adds scanned codes to the receipt"""
+        scan_frame = tk.Frame(parent_frame, bg="#f0f0f0")
+        scan_frame.pack(fill="x", **pack_options)
+        
+        scan_check = tk.Checkbutton(scan_frame, text="Scan mode", variable=self.scan_mode,
+                                    command=self.on_scan_mode_toggle, bg="#f0f0f0")
+        scan_check.pack(side="left")
+        
+        self.scan_entry = tk.Entry(scan_frame, textvariable=self.scan_var, width=20)
+        self.scan_entry.pack(side="left", padx=10)
+        self.scan_entry.bind("<Return>", self.on_scan)
+        
+        self.scan_status_label = tk.Label(scan_frame, text="", font=("Arial", 10), bg="#f0f0f0", anchor="w")
+        self.scan_status_label.pack(side="left", fill="x", expand=True)
+        
+        if self.scan_mode.get():
+            self.scan_entry.focus_set()
+    
+    def on_scan_mode_toggle(self):
+        """Keep keyboard focus on the barcode entry while scan mode is on"""
+        if self.scan_mode.get():
+            self.scan_entry.focus_set()
+        else:
+            self.scan_status_label.config(text="")
+    
+    def on_scan(self, event):
+        """Handle a scanner burst (or a typed code) terminated by Enter"""
+        code = self.scan_var.get().strip()
+        self.scan_var.set("")
+        if code:
+            self.scan_code(code)
+        # Stop the window-level Enter binding from seeing the scan
+        return "break"
+    
+    def scan_code(self, code):
+        """Resolve a product or item code from memory and add it to the receipt without dialogs"""
+        row = self.catalog.find_product_code(code)
+        if row is None:
+            keys = self.catalog.keys_with_item_code(code)
+            row = self.catalog.get(min(keys)) if keys else None
+        
+        if row is None:
+            self.scan_status_label.config(text=f"Unknown code: {code}", fg="#FF5252")
+            self.root.bell()
+            return
+        
+        self.add_row_to_cart(row)
+        self.update_cart_count()
+        self.scan_status_label.config(text=f"Added {row[3]}  Rs:{row[4]:.2f}", fg="#0047B3")
+    
     def update_item_dropdowns(self):
         """Update dropdown values based on selected category"""
         category = self.selected_category.get()
         if not category:
             return
             
-        # Get items for the selected category
-        category_items = self.categories.get(category, [])
-        
-        # Connect to database to get item details
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
-        
-        # Get items that match the category's item names
-        item_codes = []
-        product_codes = []
-        item_names = []
-        selling_prices = []
-        
-        for item_name in category_items:
-            cursor.execute("SELECT item_code, product_code, item_name, selling_price FROM items WHERE item_name=?", (item_name,))
-            result = cursor.fetchone()
-            if result:
-                item_codes.append(result[0])
-                product_codes.append(result[1])
-                item_names.append(result[2])
-                selling_prices.append(str(result[3]))
-        
-        conn.close()
+        # One category index lookup feeds both the dropdowns and the item tree
+        item_codes, product_codes, item_names, selling_prices = self.catalog.category_dropdowns(category)
         
         # Update dropdown values
         self.item_code_dropdown['values'] = item_codes
@@ -691,31 +934,11 @@ class InventoryManagementSystem:
         self.selling_price_dropdown_var.set("")
         
         # Update the item tree with items from this category
-        self.update_item_tree_with_category(category_items)
+        self.update_item_tree_with_category(category)
 
-    def update_item_tree_with_category(self, category_items):
+    def update_item_tree_with_category(self, category):
         """Update the item treeview with items from the specified category"""
-        # Clear current items
-        for item in self.item_tree.get_children():
-            self.item_tree.delete(item)
-        
-        if not category_items:
-            return
-            
-        # Connect to database
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
-        
-        # Build query to get all items that match the category's item names
-        query = "SELECT item_code, product_code, item_name, selling_price, date_added FROM items WHERE item_name IN ({})".format(
-            ','.join(['?'] * len(category_items)))
-        cursor.execute(query, category_items)
-        items = cursor.fetchall()
-        conn.close()
-        
-        # Insert into treeview
-        for item in items:
-            self.item_tree.insert("", "end", values=item)
+        self.item_tree_view.set_source(category_view(self.catalog, category))
     
     def on_dropdown_select(self, event):
         """Handle selection from any dropdown menu"""
@@ -742,157 +965,152 @@ class InventoryManagementSystem:
             self.item_name_dropdown_var.set("")
     
     def search_items(self):
-        """Search items based on dropdown selections"""
+        """Search items based on the dropdown selections and the prefix and range filters"""
         item_code = self.item_code_dropdown_var.get()
         product_code = self.product_code_dropdown_var.get()
         item_name = self.item_name_dropdown_var.get()
         selling_price = self.selling_price_dropdown_var.get()
         
-        # Build query based on selected filters
-        query = "SELECT item_code, product_code, item_name, selling_price, date_added FROM items WHERE 1=1"
-        params = []
-        
-        if item_code:
-            query += " AND item_code=?"
-            params.append(item_code)
+        selling_price = float(selling_price) if selling_price else None
+        filters = {name: var.get().strip() for name, var in self.filter_vars.items()}
         
-        if product_code:
-            query += " AND product_code=?"
-            params.append(product_code)
+        if not any(filters.values()):
+            # Filter through the catalog cache indexes and show the result page by page
+            self.item_tree_view.set_source(search_view(self.catalog, item_code, product_code, item_name,
+                                                       selling_price))
+            return
         
-        if item_name:
-            query += " AND item_name=?"
-            params.append(item_name)
+        filters.update(item_code=item_code, product_code=product_code, item_name=item_name,
+                       selling_price=selling_price)
+        try:
+            conditions = inventory_core.filter_conditions(**filters)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
         
-        if selling_price:
-            query += " AND selling_price=?"
-            params.append(float(selling_price))
+        def show_results(keys):
+            # Rows edited later join or leave the result by the same conditions
+            self.item_tree_view.set_source(CatalogView(
+                self.catalog,
+                lambda: [key for key in keys if key in self.catalog.rows],
+                lambda row: inventory_core.row_matches(row, conditions)
+            ))
         
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        items = cursor.fetchall()
-        conn.close()
+        self.run_in_background(lambda db: [row[0] for row in inventory_core.search_items(db, **filters)],
+                               show_results, channel="item_search", message="Searching...", name="item_search")
+    
+    def on_quick_search_changed(self, *args):
+        """Debounce keystrokes in the search box so only the last one queries"""
+        if self.quick_search_job is not None:
+            self.root.after_cancel(self.quick_search_job)
+        self.quick_search_job = self.root.after(self.QUICK_SEARCH_DELAY_MS, self.quick_search)
+    
+    def quick_search(self):
+        """Filter the item tree through the full-text index"""
+        self.quick_search_job = None
+        if self.item_tree_view is None:
+            return
+        tokens = search_tokens(self.quick_search_var.get())
+        if not tokens:
+            self.cancel_searches()
+            self.load_item_tree()
+            return
         
-        # Clear current items
-        for item in self.item_tree.get_children():
-            self.item_tree.delete(item)
+        def show_results(keys):
+            self.item_tree_view.set_source(CatalogView(
+                self.catalog,
+                lambda: [key for key in keys if key in self.catalog.rows],
+                lambda row: text_matches(row, tokens)
+            ))
         
-        # Insert filtered items
-        for item in items:
-            self.item_tree.insert("", "end", values=item)
+        # A newer keystroke cancels this search if it is still running
+        self.run_in_background(lambda db: text_search(db, tokens, self.QUICK_SEARCH_LIMIT),
+                               show_results, channel="quick_search", message="Searching...", name="quick_search")
     
     def clear_item_search(self):
         """Clear all dropdown selections and reload all items"""
+        self.quick_search_var.set("")
+        if self.quick_search_job is not None:
+            self.root.after_cancel(self.quick_search_job)
+            self.quick_search_job = None
         self.item_code_dropdown_var.set("")
         self.product_code_dropdown_var.set("")
         self.item_name_dropdown_var.set("")
         self.selling_price_dropdown_var.set("")
+        for var in self.filter_vars.values():
+            var.set("")
         self.selected_category.set("")
+        self.cancel_searches()
         self.load_item_tree()
     
+    def cancel_searches(self):
+        """Drop any search still in flight, so its result can't overwrite the list shown next"""
+        for channel in ("quick_search", "item_search"):
+            self.worker.submit(lambda db: None, channel=channel)
+    
     def load_item_tree(self):
         """Load all items into the item treeview"""
-        # Clear current items
-        for item in self.item_tree.get_children():
-            self.item_tree.delete(item)
-        
-        # Load from database
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT item_code, product_code, item_name, selling_price, date_added FROM items")
-        items = cursor.fetchall()
-        conn.close()
-        
-        # Insert into treeview
-        for item in items:
-            self.item_tree.insert("", "end", values=item)
+        self.item_tree_view.set_source(CatalogView(self.catalog))
     
     def load_items(self):
         """Load all items into the main treeview"""
-        # Clear current items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Load from database
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT item_code, product_code, item_name, selling_price, date_added FROM items")
-        items = cursor.fetchall()
-        conn.close()
-        
-        # Insert into treeview
-        for item in items:
-            self.tree.insert("", "end", values=item)
+        self.tree_view.set_source(CatalogView(self.catalog))
     
     def add_to_cart(self):
         """Add selected items to the Receipt"""
         # Determine which treeview to use based on current frame
-        if self.item_frame.winfo_ismapped():
-            tree = self.item_tree
+        if self.current_screen == "item":
+            view = self.item_tree_view
         else:
-            tree = self.tree
+            view = self.tree_view
         
-        selected_items = tree.selection()
+        selected_items = view.selected_rows()
         
         if not selected_items:
             messagebox.showerror("Error", "No items selected")
             return
         
-        for item_id in selected_items:
-            item_values = tree.item(item_id, "values")
+        for row in selected_items:
             try:
-                item_data = {
-                    'item_code': item_values[0],
-                    'product_code': item_values[1],
-                    'item_name': item_values[2],
-                    'selling_price': float(item_values[3]),
-                    'quantity': 1  # Default quantity
-                }
-                
-                # Check if item already in receipt
-                existing_item = next((i for i in self.cart_items if i['item_code'] == item_data['item_code']), None)
-                if existing_item:
-                    existing_item['quantity'] += 1
-                else:
-                    self.cart_items.append(item_data)
+                self.add_row_to_cart(row)
             except (ValueError, IndexError):
-                messagebox.showerror("Error", f"Invalid data for item: {item_values}")
+                messagebox.showerror("Error", f"Invalid data for item: {row[1:]}")
                 continue
         
         # Update cart count label
         self.update_cart_count()
         messagebox.showinfo("Success", f"{len(selected_items)} item(s) added to cart")
     
+    def add_row_to_cart(self, row):
+        """Add one items row to the receipt, bumping the quantity if already present"""
+        self.cart.add(row)
+    
     def update_cart_count(self):
         """Update the cart count label"""
-        total_items = sum(item['quantity'] for item in self.cart_items)
-        if self.item_frame.winfo_ismapped():
-            self.cart_count_label.config(text=f"Items in receipt: {total_items}")
-        else:
-            self.cart_count_label.config(text=f"Items in receipt: {total_items}")
+        total_items = self.cart.count
+        self.cart_count_label.config(text=f"Items in receipt: {total_items}")
     
     def clear_cart(self):
         """Clear all items from the cart"""
-        if not self.cart_items:
+        if not self.cart:
             return
         
         confirm = messagebox.askyesno("Clear receipt", "Are you sure you want to clear the cart?")
         if confirm:
-            self.cart_items = []
+            self.cart.clear()
             self.update_cart_count()
             messagebox.showinfo("Cart Cleared", "All items have been removed from the cart")
     
     def print_bill(self):
         """Generate and print a bill for all items in the cart"""
-        if not self.cart_items:
+        if not self.cart:
             # If cart is empty, check if items are selected in tree
-            if self.item_frame.winfo_ismapped():
-                tree = self.item_tree
+            if self.current_screen == "item":
+                view = self.item_tree_view
             else:
-                tree = self.tree
+                view = self.tree_view
             
-            selected_items = tree.selection()
+            selected_items = view.selection_keys()
             if selected_items:
                 # Add selected items to cart first
                 self.add_to_cart()
@@ -900,231 +1118,276 @@ class InventoryManagementSystem:
                 messagebox.showerror("Error", "No items in cart. Please add items to cart first.")
                 return
         
-        # Calculate totals
-        subtotal = sum(item['selling_price'] * item['quantity'] for item in self.cart_items)
-        tax = subtotal * 0.07  # 7% tax rate
-        total = subtotal + tax
-        
-        # Generate a bill
-        bill_text = f"""
-=====================================================
-                CIB INVENTORY SYSTEM
-=====================================================
-Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-Bill No: BILL-{datetime.now().strftime('%Y%m%d%H%M%S')}
-
------------------------------------------------------
-Item Code      Item Name       Qty    Price    Total
------------------------------------------------------
-"""
-        
-        # Add items to bill
-        for item in self.cart_items:
-            item_total = item['selling_price'] * item['quantity']
-            bill_text += f"{item['item_code']:<15}{item['item_name']:<15}{item['quantity']:<8}Rs:{item['selling_price']:<8.2f}Rs:{item_total:<8.2f}\n"
-        
-        # Add totals
-        bill_text += f"""
------------------------------------------------------
-Subtotal: Rs:{subtotal:.2f}
-Tax (7%): Rs:{tax:.2f}
------------------------------------------------------
-TOTAL:    Rs:{total:.2f}
-=====================================================
-                   Thank You!
-=====================================================
-"""
-        
-        # Get user's desktop path for saving the bill
-        try:
-            if os.name == 'nt':  # Windows
-                desktop = os.path.join(os.path.expanduser('~'), 'Desktop')
-            else:  # macOS and Linux
-                desktop = os.path.join(os.path.expanduser('~'), 'Desktop')
-                
-            # If desktop folder doesn't exist, use home directory
-            if not os.path.exists(desktop):
-                desktop = os.path.expanduser('~')
-                
-            # Create a 'Bills' folder if it doesn't exist
-            bills_folder = os.path.join(desktop, 'CIB_Bills')
-            if not os.path.exists(bills_folder):
-                os.makedirs(bills_folder)
-                
-            # Create filename with timestamp
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            filename = os.path.join(bills_folder, f"CIB_Bill_{timestamp}.txt")
-            
-            # Save bill to file
-            with open(filename, "w") as f:
-                f.write(bill_text)
-            
-            # Also save a copy in the application directory for reference
-            local_filename = f"bill_{timestamp}.txt"
-            with open(local_filename, "w") as f:
-                f.write(bill_text)
-            
-            messagebox.showinfo("Bill Generated", f"Bill has been saved to:\n{filename}")
-            
-            # Try to open the file with default text editor
+        # Start a fresh receipt right away so scanning can continue while the
+        # sale is recorded and the bill file is written in the background
+        receipt = self.cart
+        self.cart = Receipt()
+        self.update_cart_count()
+        sold_at = datetime.now()
+        
+        def finalize(db):
+            # Record the sale first so the bill number comes from the ledger
+            sale_id, bill_no = record_sale(db, receipt, sold_at)
             try:
-                if os.name == 'nt':  # For Windows
-                    os.startfile(filename)
-                elif os.name == 'posix':  # For macOS and Linux
-                    os.system(f"open {filename}" if os.uname().sysname == "Darwin" else f"xdg-open {filename}")
-            except Exception as e:
-                messagebox.showinfo("Note", f"Bill saved but couldn't automatically open it.\nYou can find it at: {filename}")
+                return save_bill(format_bill(receipt, bill_no, sold_at), bill_no)
+            except OSError as e:
+                return None, e
+        
+        def on_saved(result):
+            filename, in_app_folder = result
+            if filename is None:
+                messagebox.showerror("Error", f"Sale recorded but the bill file could not be written: {in_app_folder}")
+            elif in_app_folder:
+                messagebox.showinfo("Bill Generated", f"Bill has been saved to the application folder as: {filename}")
+            else:
+                messagebox.showinfo("Bill Generated", f"Bill has been saved to:\n{filename}")
                 
-        except Exception as e:
-            # Fallback to saving in the current directory if there's an issue
-            filename = f"bill_{datetime.now().strftime('%Y%m%d%H%M%S')}.txt"
-            with open(filename, "w") as f:
-                f.write(bill_text)
-            messagebox.showinfo("Bill Generated", f"Bill has been saved to the application folder as: {filename}")
-        
-        # Ask if user wants to clear cart after printing
-        clear_confirm = messagebox.askyesno("Clear Cart", "Bill saved successfully. Clear cart now?")
-        if clear_confirm:
-            self.cart_items = []
+                # Try to open the file with default text editor
+                try:
+                    if os.name == 'nt':  # For Windows
+                        os.startfile(filename)
+                    elif os.name == 'posix':  # For macOS and Linux
+                        os.system(f"open {filename}" if os.uname().sysname == "Darwin" else f"xdg-open {filename}")
+                except Exception as e:
+                    messagebox.showinfo("Note", f"Bill saved but couldn't automatically open it.\nYou can find it at: {filename}")
+        
+        def on_failed(error):
+            # Nothing was recorded, put the lines back on the receipt
+            self.cart.merge(receipt)
             self.update_cart_count()
+            messagebox.showerror("Database Error", f"Sale was not recorded: {str(error)}")
+        
+        self.run_in_background(finalize, on_saved, on_failed, message="Saving bill...", name="print_bill")
     
     def add_item(self):
-        item_code = self.item_code_var.get().strip()
-        product_code = self.product_code_var.get().strip()
-        item_name = self.item_name_var.get().strip()
-        selling_price = self.selling_price_var.get().strip()
-        
-        # Validate input
-        if not (item_code and product_code and item_name and selling_price):
-            messagebox.showerror("Error", "All fields are required")
-            return
-        
+        # Validate input before queueing any database work
         try:
-            selling_price = float(selling_price)
-            if selling_price < 0:
-                raise ValueError("Price cannot be negative")
-        except ValueError:
-            messagebox.showerror("Error", "Selling price must be a positive number")
+            fields = inventory_core.parse_item(self.item_code_var.get(), self.product_code_var.get(),
+                                               self.item_name_var.get(), self.selling_price_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
         
-        try:
-            conn = sqlite3.connect('inventory.db')
-            cursor = conn.cursor()
-            
-            
-                
-            # Check if product code already exists
-            cursor.execute("SELECT * FROM items WHERE product_code=?", (product_code,))
-            if cursor.fetchone():
-                messagebox.showerror("Error", "Product code already exists")
-                conn.close()
-                return
-            
-            # Insert new item
-            current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor.execute(
-                "INSERT INTO items (item_code, product_code, item_name, selling_price, date_added) VALUES (?, ?, ?, ?, ?)",
-                (item_code, product_code, item_name, selling_price, current_date)
-            )
-            conn.commit()
-            conn.close()
-            
+        def on_inserted(new_row):
             # Clear fields
             self.clear_fields()
             
-            # Reload items
-            self.load_items()
+            # Show the new row without reloading the table
+            self.apply_item_change(None, new_row)
             
             messagebox.showinfo("Success", "Item added successfully")
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error: {str(e)}")
+        
+        self.run_in_background(lambda db: inventory_core.add_item(db, *fields), on_inserted,
+                               message="Saving item...", name="add_item")
     
     def delete_item(self):
-        selected_item = self.tree.selection()
+        selected_rows = self.tree_view.selected_rows()
         
-        if not selected_item:
+        if not selected_rows:
             messagebox.showerror("Error", "No item selected")
             return
         
-        item_values = self.tree.item(selected_item[0], "values")
-        item_code = item_values[0]
-        
-        confirm = messagebox.askyesno("Confirm", f"Delete item {item_code}?")
+        if len(selected_rows) == 1:
+            question = f"Delete item {selected_rows[0][1]} ({selected_rows[0][2]})?"
+        else:
+            question = f"Delete the {len(selected_rows)} selected items?"
+        confirm = messagebox.askyesno("Confirm", question)
         if confirm:
-            try:
-                conn = sqlite3.connect('inventory.db')
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM items WHERE item_code=?", (item_code,))
-                conn.commit()
-                conn.close()
-                
-                self.load_items()
+            def delete_rows(db):
+                # Exactly the selected rows, each only if no other till changed it since
+                with db.transaction(immediate=True):
+                    return [inventory_core.delete_item(db, row[0], row[6]) for row in selected_rows]
+            
+            def on_deleted(old_rows):
+                for old_row in old_rows:
+                    self.apply_item_change(old_row, None)
                 self.clear_fields()
                 
                 messagebox.showinfo("Success", "Item deleted successfully")
-                
-            except Exception as e:
-                messagebox.showerror("Database Error", f"Error: {str(e)}")
+            
+            self.run_in_background(delete_rows, on_deleted, self.show_item_error,
+                                   message="Deleting item...", name="delete_item")
     
     def update_item(self):
-        selected_items = self.tree.selection()
+        selected_rows = self.tree_view.selected_rows()
         
-        if not selected_items:
+        if not selected_rows:
             messagebox.showerror("Error", "No item selected")
             return
-        
-        item_code = self.item_code_var.get().strip()
-        product_code = self.product_code_var.get().strip()
-        item_name = self.item_name_var.get().strip()
-        selling_price = self.selling_price_var.get().strip()
-        
-        # Validate input
-        if not (item_code and product_code and item_name and selling_price):
-            messagebox.showerror("Error", "All fields are required")
+        if len(selected_rows) > 1:
+            messagebox.showerror("Error", "Select a single item to update")
             return
+        row = selected_rows[0]
         
+        # Validate input before queueing any database work
         try:
-            selling_price = float(selling_price)
-            if selling_price < 0:
-                raise ValueError("Price cannot be negative")
-        except ValueError:
-            messagebox.showerror("Error", "Selling price must be a positive number")
+            fields = inventory_core.parse_item(self.item_code_var.get(), self.product_code_var.get(),
+                                               self.item_name_var.get(), self.selling_price_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
         
-        try:
-            conn = sqlite3.connect('inventory.db')
-            cursor = conn.cursor()
-            
-            # Check if product code is being changed to one that already exists
-            cursor.execute("SELECT product_code FROM items WHERE item_code=?", (item_code,))
-            current_product_code = cursor.fetchone()[0]
-            
-            if product_code != current_product_code:
-                cursor.execute("SELECT * FROM items WHERE product_code=?", (product_code,))
-                if cursor.fetchone():
-                    messagebox.showerror("Error", "Product code already exists")
-                    conn.close()
-                    return
-            
-            # Update item
-            cursor.execute(
-                "UPDATE items SET product_code=?, item_name=?, selling_price=? WHERE item_code=?",
-                (product_code, item_name, selling_price, item_code)
-            )
-            conn.commit()
-            conn.close()
-            
-            # Reload items
-            self.load_items()
+        def on_updated(change):
+            # Patch the changed row in place
+            self.apply_item_change(*change)
             
             # Clear fields
             self.clear_fields()
             
             messagebox.showinfo("Success", "Item updated successfully")
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error: {str(e)}")
+        
+        self.run_in_background(lambda db: inventory_core.update_item(db, row[0], *fields, row[6]), on_updated,
+                               self.show_item_error, message="Saving item...", name="update_item")
+    
+    def show_item_error(self, error):
+        """Error handler for item edits; a conflict means our copy of the catalog is stale"""
+        if isinstance(error, inventory_core.ConflictError):
+            self.reload_catalog()
+        self.show_job_error(error)
+    
+    def apply_item_change(self, old_row, new_row):
+        """Write one committed items change through the catalog cache and both treeviews"""
+        if new_row is None:
+            self.catalog.remove(old_row[0])
+        else:
+            self.catalog.put(new_row)
+        
+        for view in (self.tree_view, self.item_tree_view):
+            if view is None or view.source is None:
+                continue
+            if view.source.generation == self.catalog.generation - 1:
+                view.apply_change(old_row, new_row)
+            else:
+                # The view missed an earlier change, rebuild it from memory
+                view.source.rebuild()
+                view.refresh()
+    
+    def import_items_csv(self):
+        """Add or update items in bulk from a CSV price list, matched on product code"""
+        path = filedialog.askopenfilename(title="Import Items",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        def report(count):
+            self.worker.call_soon(lambda: self.status_label.config(text=f"Imported {count} rows..."))
+        
+        def on_imported(count):
+            self.reload_catalog()
+            messagebox.showinfo("Import Complete", f"{count} items imported from:\n{path}")
+        
+        def on_failed(error):
+            # Chunks committed before the error stay imported
+            self.reload_catalog()
+            messagebox.showerror("Import Error", f"Import stopped: {str(error)}")
+        
+        self.run_in_background(lambda db: import_file(db, path, report), on_imported, on_failed,
+                               message="Importing items...", name="import_items")
+    
+    def export_items_csv(self):
+        """Write the whole catalog to a CSV file"""
+        path = filedialog.asksaveasfilename(title="Export Items", defaultextension=".csv",
+                                            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        def report(count):
+            self.worker.call_soon(lambda: self.status_label.config(text=f"Exported {count} rows..."))
+        
+        def on_exported(count):
+            messagebox.showinfo("Export Complete", f"{count} items exported to:\n{path}")
+        
+        self.run_in_background(lambda db: export_file(db, path, report), on_exported,
+                               message="Exporting items...", name="export_items")
+    
+    def reload_catalog(self):
+        """Read and index the items table on the worker thread, then swap it into the cache"""
+        categories = self.categories
+        self.run_in_background(lambda db: build_catalog(db, categories), self.on_catalog_loaded, channel="catalog",
+                               message="Loading catalog...", name="load_catalog")
+    
+    def on_catalog_loaded(self, catalog):
+        self.catalog.adopt(catalog)
+        for view in (self.tree_view, self.item_tree_view):
+            if view is not None and view.source is not None and view.source.is_stale():
+                view.source.rebuild()
+                view.refresh()
+    
+    def run_in_background(self, func, on_done, on_error=None, channel=None, message="Working...", name=None):
+        """Run func(db) on the database worker and call on_done(result) back on the Tk thread"""
+        if on_error is None:
+            on_error = self.show_job_error
+        self.status_label.config(text=message)
+        return self.worker.submit(func, on_done, on_error, channel, name)
+    
+    def show_job_error(self, error):
+        """Default error handler for background jobs"""
+        if isinstance(error, ValueError):
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Database Error", f"Error: {str(error)}")
+    
+    def on_worker_busy(self, busy):
+        """Show the progress indicator while database jobs are pending"""
+        if busy:
+            self.progress.pack(side="right", padx=10, pady=2)
+            self.progress.start(10)
+        else:
+            self.progress.stop()
+            self.progress.pack_forget()
+            self.status_label.config(text="")
+    
+    def show_diagnostics(self, event=None):
+        """Open the diagnostics window with live per-operation latency percentiles"""
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Diagnostics")
+        window.geometry("760x420")
+        self.diagnostics_window = window
+        
+        columns = ("count", "p50", "p95", "p99", "max")
+        tree = ttk.Treeview(window, columns=columns)
+        tree.heading("#0", text="Operation")
+        tree.column("#0", width=330)
+        for column in columns:
+            tree.heading(column, text=column if column == "count" else f"{column} (ms)")
+            tree.column(column, width=80, anchor="e")
+        tree.pack(fill="both", expand=True, padx=10, pady=(10, 0))
+        
+        button_frame = tk.Frame(window)
+        button_frame.pack(fill="x", padx=10, pady=10)
+        summary_label = tk.Label(button_frame, text="", anchor="w")
+        summary_label.pack(side="left", fill="x", expand=True)
+        
+        def export():
+            try:
+                METRICS.export(METRICS_FILE)
+                summary_label.config(text=f"Exported to {os.path.abspath(METRICS_FILE)}")
+            except OSError as e:
+                messagebox.showerror("Error", f"Could not write metrics: {str(e)}")
+        
+        tk.Button(button_frame, text="Export", command=export).pack(side="right", padx=5)
+        tk.Button(button_frame, text="Reset", command=METRICS.reset).pack(side="right", padx=5)
+        
+        def refresh():
+            if not window.winfo_exists():
+                return
+            snapshot = METRICS.snapshot()
+            for name in set(tree.get_children()) - set(snapshot):
+                tree.delete(name)
+            for index, (name, summary) in enumerate(snapshot.items()):
+                values = (summary["count"], f"{summary['p50_ms']:.2f}", f"{summary['p95_ms']:.2f}",
+                          f"{summary['p99_ms']:.2f}", f"{summary['max_ms']:.2f}")
+                if tree.exists(name):
+                    tree.item(name, values=values)
+                else:
+                    tree.insert("", index, iid=name, text=name, values=values)
+            window.after(self.DIAGNOSTICS_REFRESH_MS, refresh)
+        
+        refresh()
     
     def clear_fields(self):
         self.item_code_var.set("")
@@ -1133,21 +1396,42 @@ TOTAL:    Rs:{total:.2f}
         self.selling_price_var.set("")
     
     def on_item_select(self, event):
-        selected_items = self.tree.selection()
+        selected_items = self.tree_view.selected_rows()
         
         if len(selected_items) == 1:
-            item_values = self.tree.item(selected_items[0], "values")
+            item_values = selected_items[0][1:]
             if len(item_values) >= 4:  # Ensure all required values are present    
                 self.item_code_var.set(item_values[0])
                 self.product_code_var.set(item_values[1])
                 self.item_name_var.set(item_values[2])
                 self.selling_price_var.set(item_values[3])
+            self.show_stock(selected_items[0])
         elif len(selected_items) > 1:
             # Clear form fields when multiple items are selected
             self.clear_fields()
+    
+    def show_stock(self, row):
+        """Show the on-hand quantity of an items row next to the scan entry"""
+        def on_read(quantity):
+            self.scan_status_label.config(text=f"{row[3]}: {quantity} on hand", fg="#FF5252" if quantity <= 0 else "#555")
+        
+        self.run_in_background(lambda db: on_hand(db, row[0]), on_read, channel="stock",
+                               message="Reading stock...", name="stock_level")
 
 # Main application runner
 if __name__ == "__main__":
+    # --startup-time: print cold start timings as JSON and exit once login is usable
+    startup_probe = "--startup-time" in sys.argv[1:]
+    enable_slow_log(SLOW_LOG_FILE)
     root = tk.Tk()
     app = InventoryManagementSystem(root)
-    root.mainloop()
\ No newline at end of file
+    app.exit_when_ready = startup_probe
+    root.mainloop()
+    app.worker.stop()
+    if startup_probe:
+        if app.database_error is not None:
+            sys.exit(1)
+        snapshot = METRICS.snapshot()
+        print(json.dumps({name: snapshot[name]["max_ms"] for name in snapshot if name.startswith("startup:")}))
+    else:
+        METRICS.export(METRICS_FILE)
\ No newline at end of file
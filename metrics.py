@@ -0,0 +1,163 @@
+"""Low-overhead latency counters for SQL, worker jobs and UI handlers
+
+Every timed operation appends one duration to a bounded window under a
+lock; percentiles are only computed when a snapshot is taken, so recording
+costs two perf_counter() calls and a deque append.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Samples kept per operation for the rolling percentiles
+WINDOW = 1024
+# Operations slower than this are written to the slow log
+SLOW_MS = 100
+
+slow_log = logging.getLogger("inventory.slow")
+slow_log.addHandler(logging.NullHandler())
+
+
+class Histogram:
+    """Lifetime count/total/max plus the most recent WINDOW durations of one operation"""
+
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+
+    def summary(self):
+        """Counters and p50/p95/p99 over the recent window, in milliseconds"""
+        recent = sorted(self.recent)
+
+        def percentile(p):
+            return recent[min(len(recent) - 1, int(p / 100 * len(recent)))] * 1000 if recent else 0.0
+
+        return {"count": self.count, "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+                "p50_ms": percentile(50), "p95_ms": percentile(95), "p99_ms": percentile(99),
+                "max_ms": self.max * 1000}
+
+
+class Metrics:
+    """Named histograms shared by every thread of the application"""
+
+    def __init__(self, slow_ms=SLOW_MS):
+        self.slow_ms = slow_ms
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.started = datetime.now()
+        # Per thread: seconds spent inside untimed() calls so far
+        self.local = threading.local()
+
+    def record(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+        if seconds * 1000 >= self.slow_ms:
+            slow_log.warning("%s took %.1f ms", name, seconds * 1000)
+
+    @contextmanager
+    def timer(self, name):
+        """Time the body of a with block as one sample of name"""
+        paused = getattr(self.local, "paused", 0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(name, elapsed - (getattr(self.local, "paused", 0.0) - paused))
+
+    def timed(self, name=None):
+        """Decorator recording every call of a function, by default under its qualified name"""
+        def decorate(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                paused = getattr(self.local, "paused", 0.0)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    self.record(label, elapsed - (getattr(self.local, "paused", 0.0) - paused))
+            return wrapper
+        return decorate
+
+    def untimed(self, func):
+        """Wrap func so its duration is left out of every enclosing timed() call
+
+        Used for modal dialogs, where the time is spent waiting on the user.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.local.paused = getattr(self.local, "paused", 0.0) + time.perf_counter() - start
+        return wrapper
+
+    def instrument(self, prefix):
+        """Class decorator timing every public method as prefix:method_name"""
+        def decorate(cls):
+            for attr, value in list(vars(cls).items()):
+                if callable(value) and not attr.startswith("_"):
+                    setattr(cls, attr, self.timed(f"{prefix}:{attr}")(value))
+            return cls
+        return decorate
+
+    def snapshot(self):
+        """{operation: summary} sorted by name"""
+        with self.lock:
+            items = sorted(self.histograms.items())
+            return {name: histogram.summary() for name, histogram in items}
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.started = datetime.now()
+
+    def export(self, path):
+        """Write the current counters to a JSON metrics file"""
+        document = {"since": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+                    "exported": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "slow_ms": self.slow_ms,
+                    "operations": self.snapshot()}
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2)
+
+
+def enable_slow_log(path):
+    """Append slow operations to a log file"""
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(threadName)s %(message)s"))
+    slow_log.addHandler(handler)
+    slow_log.setLevel(logging.WARNING)
+    slow_log.propagate = False
+
+
+@functools.lru_cache(maxsize=1024)
+def sql_label(sql):
+    """Short operation name for a statement: its first words, whitespace collapsed"""
+    return "sql:" + " ".join(sql.split())[:60]
+
+
+# The process-wide registry
+METRICS = Metrics()
@@ -0,0 +1,59 @@
+"""As-of selling prices from the price_history table
+
+Every price a product code has had is kept with the time it took effect;
+triggers on items append to the history, nothing ever updates it. Both
+lookups walk the (product_code, valid_from) index, so their cost depends
+on the number of product codes asked about, not on the length of the
+history.
+"""
+from datetime import datetime
+
+# Latest history row of one product code at or before a time
+PRICE_AT_SQL = '''
+SELECT selling_price FROM price_history WHERE product_code=? AND valid_from <= ?
+ORDER BY valid_from DESC, id DESC LIMIT 1
+'''
+
+# The distinct product codes are enumerated by repeatedly seeking the next
+# one in the index (a loose index scan), then each is resolved as PRICE_AT_SQL
+PRICE_LIST_AT_SQL = '''
+WITH RECURSIVE codes(product_code) AS (
+    SELECT MIN(product_code) FROM price_history
+    UNION ALL
+    SELECT (SELECT MIN(product_code) FROM price_history WHERE product_code > codes.product_code)
+    FROM codes WHERE codes.product_code IS NOT NULL
+)
+SELECT product_code, selling_price FROM (
+    SELECT product_code, (
+        SELECT h.selling_price FROM price_history h WHERE h.product_code = codes.product_code AND h.valid_from <= ?
+        ORDER BY h.valid_from DESC, h.id DESC LIMIT 1
+    ) AS selling_price
+    FROM codes WHERE product_code IS NOT NULL
+)
+WHERE selling_price IS NOT NULL
+ORDER BY product_code
+'''
+
+
+def as_of_text(when):
+    """History timestamps are local "YYYY-MM-DD HH:MM:SS" strings; a date means the end of that day"""
+    if isinstance(when, datetime):
+        return when.strftime("%Y-%m-%d %H:%M:%S")
+    return f"{when.isoformat()} 23:59:59"
+
+
+def price_at(db, product_code, when):
+    """Selling price of a product code at a time, or None if it was not on sale then"""
+    row = db.query_one(PRICE_AT_SQL, (product_code, as_of_text(when)))
+    return row[0] if row else None
+
+
+def price_list_at(db, when):
+    """[(product_code, selling_price)] of everything on sale at a time, by product code"""
+    return db.query_all(PRICE_LIST_AT_SQL, (as_of_text(when),))
+
+
+def price_history(db, product_code):
+    """[(valid_from, selling_price)] of a product code, oldest first; None marks it withdrawn"""
+    return db.query_all("SELECT valid_from, selling_price FROM price_history WHERE product_code=? "
+                        "ORDER BY valid_from, id", (product_code,))
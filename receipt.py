@@ -0,0 +1,103 @@
+class ReceiptLine:
+    """One item on a receipt; prices are kept in cents so running totals stay exact"""
+
+    __slots__ = ("key", "item_code", "product_code", "item_name", "price_cents", "quantity")
+
+    def __init__(self, key, item_code, product_code, item_name, price_cents, quantity):
+        self.key = key
+        self.item_code = item_code
+        self.product_code = product_code
+        self.item_name = item_name
+        self.price_cents = price_cents
+        self.quantity = quantity
+
+    @property
+    def selling_price(self):
+        return self.price_cents / 100
+
+    @property
+    def total(self):
+        return self.price_cents * self.quantity / 100
+
+
+class Receipt:
+    """Lines keyed by items.id with subtotal and item count maintained on every change
+
+    Adding, removing and changing the quantity of a line are all O(1), and
+    the totals never need to be recomputed from the lines.
+    """
+
+    TAX_RATE = 0.07
+
+    def __init__(self):
+        self.lines = {}
+        self.subtotal_cents = 0
+        self.count = 0
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines.values())
+
+    def __contains__(self, key):
+        return key in self.lines
+
+    def add(self, row, quantity=1):
+        """Add an items row, bumping the quantity if it is already on the receipt"""
+        key = row[0]
+        line = self.lines.get(key)
+        if line is None:
+            line = ReceiptLine(key, row[1], row[2], row[3], round(float(row[4]) * 100), 0)
+            self.lines[key] = line
+        self._change(line, quantity)
+        return line
+
+    def set_quantity(self, key, quantity):
+        """Change a line's quantity; zero or less removes the line"""
+        if quantity <= 0:
+            self.remove(key)
+            return
+        line = self.lines[key]
+        self._change(line, quantity - line.quantity)
+
+    def remove(self, key):
+        """Drop a line entirely"""
+        line = self.lines.pop(key)
+        self.subtotal_cents -= line.price_cents * line.quantity
+        self.count -= line.quantity
+
+    def merge(self, other):
+        """Add every line of another receipt to this one"""
+        for line in other:
+            self.add((line.key, line.item_code, line.product_code, line.item_name, line.price_cents / 100),
+                     line.quantity)
+
+    def clear(self):
+        self.lines.clear()
+        self.subtotal_cents = 0
+        self.count = 0
+
+    def _change(self, line, delta):
+        line.quantity += delta
+        self.subtotal_cents += line.price_cents * delta
+        self.count += delta
+
+    @property
+    def subtotal(self):
+        return self.subtotal_cents / 100
+
+    @property
+    def tax_cents(self):
+        return round(self.subtotal_cents * self.TAX_RATE)
+
+    @property
+    def tax(self):
+        return self.tax_cents / 100
+
+    @property
+    def total(self):
+        return (self.subtotal_cents + self.tax_cents) / 100
@@ -0,0 +1,107 @@
+"""Sales reports served from rollup tables instead of the raw ledger
+
+sales_daily, sales_daily_items and sales_daily_categories hold one row per
+day (per day and product code, per day and category). record_sale adds each
+bill to them in its own transaction, so a report reads a few rows per day
+in the range however many bills were sold. Categories are matched on the
+item name the way the item screen files them; items in no category are
+totalled under ''. rebuild_rollups() recomputes everything from the ledger,
+e.g. after the categories were reorganized.
+"""
+from datetime import date, timedelta
+
+# Shown for the '' category of uncategorized items
+UNCATEGORIZED = "(uncategorized)"
+
+# Each statement folds the sales matching {where} into a rollup; s is the
+# sales table. With s.id=? it adds one bill, with true it fills empty tables.
+ROLLUP_SQL = (
+    '''
+    INSERT INTO sales_daily (day, bills, units, subtotal_cents, tax_cents, total_cents)
+    SELECT substr(s.sold_at, 1, 10), COUNT(*), SUM(s.item_count), SUM(s.subtotal_cents), SUM(s.tax_cents),
+           SUM(s.total_cents)
+    FROM sales s WHERE {where} GROUP BY 1
+    ON CONFLICT(day) DO UPDATE SET
+        bills=bills + excluded.bills, units=units + excluded.units,
+        subtotal_cents=subtotal_cents + excluded.subtotal_cents, tax_cents=tax_cents + excluded.tax_cents,
+        total_cents=total_cents + excluded.total_cents
+    ''',
+    '''
+    INSERT INTO sales_daily_items (day, product_code, item_code, item_name, units, revenue_cents)
+    SELECT substr(s.sold_at, 1, 10), l.product_code, MAX(l.item_code), MAX(l.item_name), SUM(l.quantity),
+           SUM(l.unit_price_cents * l.quantity)
+    FROM sale_lines l JOIN sales s ON s.id = l.sale_id WHERE {where} GROUP BY 1, 2
+    ON CONFLICT(day, product_code) DO UPDATE SET
+        item_code=excluded.item_code, item_name=excluded.item_name,
+        units=units + excluded.units, revenue_cents=revenue_cents + excluded.revenue_cents
+    ''',
+    '''
+    INSERT INTO sales_daily_categories (day, category, units, revenue_cents)
+    SELECT substr(s.sold_at, 1, 10), COALESCE(c.name, ''), SUM(l.quantity), SUM(l.unit_price_cents * l.quantity)
+    FROM sale_lines l JOIN sales s ON s.id = l.sale_id
+    LEFT JOIN category_items ci ON ci.item_name = l.item_name
+    LEFT JOIN categories c ON c.id = ci.category_id
+    WHERE {where} GROUP BY 1, 2
+    ON CONFLICT(day, category) DO UPDATE SET
+        units=units + excluded.units, revenue_cents=revenue_cents + excluded.revenue_cents
+    ''',
+)
+
+ROLLUP_TABLES = ("sales_daily", "sales_daily_items", "sales_daily_categories")
+
+
+def record_sale_rollups(cursor, sale_id):
+    """Add a recorded sale to every rollup; call inside the sale's transaction"""
+    for sql in ROLLUP_SQL:
+        cursor.execute(sql.format(where="s.id = ?"), (sale_id,))
+
+
+def rebuild_rollups(db):
+    """Recompute the rollups from the whole ledger in one transaction; returns the number of days covered"""
+    with db.transaction(immediate=True) as cursor:
+        for table in ROLLUP_TABLES:
+            cursor.execute(f"DELETE FROM {table}")
+        for sql in ROLLUP_SQL:
+            cursor.execute(sql.format(where="true"))
+        return cursor.execute("SELECT COUNT(*) FROM sales_daily").fetchone()[0]
+
+
+def date_range(start=None, end=None, days=30):
+    """ISO (start, end) strings, defaulting to the last days days up to today"""
+    end = end or date.today()
+    start = start or end - timedelta(days=days - 1)
+    return start.isoformat(), end.isoformat()
+
+
+def daily_revenue(db, start, end):
+    """(day, bills, units, subtotal_cents, tax_cents, total_cents) per day with sales"""
+    return db.query_all(
+        "SELECT day, bills, units, subtotal_cents, tax_cents, total_cents FROM sales_daily "
+        "WHERE day BETWEEN ? AND ? ORDER BY day", (start, end)
+    )
+
+
+def weekly_revenue(db, start, end):
+    """The same totals per Monday-to-Sunday week, keyed by the Monday"""
+    return db.query_all(
+        "SELECT date(day, '-6 days', 'weekday 1') AS week, SUM(bills), SUM(units), SUM(subtotal_cents), "
+        "SUM(tax_cents), SUM(total_cents) FROM sales_daily WHERE day BETWEEN ? AND ? GROUP BY week ORDER BY week",
+        (start, end)
+    )
+
+
+def item_totals(db, start, end, limit=-1):
+    """(product_code, item_code, item_name, units, revenue_cents), best sellers first"""
+    return db.query_all(
+        "SELECT product_code, MAX(item_code), MAX(item_name), SUM(units), SUM(revenue_cents) AS revenue "
+        "FROM sales_daily_items WHERE day BETWEEN ? AND ? GROUP BY product_code "
+        "ORDER BY revenue DESC, product_code LIMIT ?", (start, end, limit)
+    )
+
+
+def category_totals(db, start, end):
+    """(category, units, revenue_cents), best sellers first"""
+    return db.query_all(
+        "SELECT category, SUM(units), SUM(revenue_cents) AS revenue FROM sales_daily_categories "
+        "WHERE day BETWEEN ? AND ? GROUP BY category ORDER BY revenue DESC, category", (start, end)
+    )
@@ -0,0 +1,112 @@
+import os
+from datetime import datetime
+
+from metrics import METRICS
+from reports import record_sale_rollups
+from stock import record_sale_movements
+
+
+def bill_number(sale_id, sold_at):
+    """Printable bill number for a sales row"""
+    return f"BILL-{sold_at:%Y%m%d}-{sale_id:06d}"
+
+
+def record_sale(db, receipt, sold_at=None):
+    """Write a finalized receipt to the sales ledger in one transaction
+
+    Returns (sale_id, bill_no). The sale id is allocated by AUTOINCREMENT
+    while this transaction holds the write lock, so ids (and therefore bill
+    numbers) are unique and strictly increasing across every process that
+    shares the database, and a committed id is never handed out again even
+    if the sale is later deleted. The sold quantities are taken out of stock
+    and added to the report rollups in the same transaction, so the ledger,
+    the on-hand balances and the reports never disagree.
+    """
+    sold_at = sold_at or datetime.now()
+    with db.transaction(immediate=True) as cursor:
+        cursor.execute(
+            "INSERT INTO sales (sold_at, item_count, subtotal_cents, tax_cents, total_cents) VALUES (?, ?, ?, ?, ?)",
+            (sold_at.strftime("%Y-%m-%d %H:%M:%S"), receipt.count, receipt.subtotal_cents,
+             receipt.tax_cents, receipt.subtotal_cents + receipt.tax_cents)
+        )
+        sale_id = cursor.lastrowid
+        bill_no = bill_number(sale_id, sold_at)
+        cursor.execute("UPDATE sales SET bill_no=? WHERE id=?", (bill_no, sale_id))
+        cursor.executemany(
+            "INSERT INTO sale_lines (sale_id, line_no, item_id, item_code, product_code, item_name, "
+            "unit_price_cents, quantity) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((sale_id, line_no, line.key, line.item_code, line.product_code, line.item_name,
+              line.price_cents, line.quantity)
+             for line_no, line in enumerate(receipt, 1))
+        )
+        record_sale_movements(cursor, sale_id, sold_at)
+        record_sale_rollups(cursor, sale_id)
+    return sale_id, bill_no
+
+
+def format_bill(receipt, bill_no, sold_at):
+    """Render a receipt as the plain-text bill handed to the customer"""
+    bill_text = f"""
+=====================================================
+                CIB INVENTORY SYSTEM
+=====================================================
+Date: {sold_at.strftime("%Y-%m-%d %H:%M:%S")}
+Bill No: {bill_no}
+
+-----------------------------------------------------
+Item Code      Item Name       Qty    Price    Total
+-----------------------------------------------------
+"""
+    
+    # Add items to bill
+    bill_text += "".join(
+        f"{line.item_code:<15}{line.item_name:<15}{line.quantity:<8}Rs:{line.selling_price:<8.2f}Rs:{line.total:<8.2f}\n"
+        for line in receipt
+    )
+    
+    # Add totals
+    bill_text += f"""
+-----------------------------------------------------
+Subtotal: Rs:{receipt.subtotal:.2f}
+Tax (7%): Rs:{receipt.tax:.2f}
+-----------------------------------------------------
+TOTAL:    Rs:{receipt.total:.2f}
+=====================================================
+                   Thank You!
+=====================================================
+"""
+    return bill_text
+
+
+@METRICS.timed("bill:save")
+def save_bill(bill_text, bill_no):
+    """Write the bill to ~/Desktop/CIB_Bills plus a local copy
+
+    Returns (filename, in_app_folder); in_app_folder is True when the
+    desktop copy failed and the bill only went to the application folder.
+    """
+    try:
+        # Use the user's desktop, or the home directory if there is none
+        desktop = os.path.join(os.path.expanduser('~'), 'Desktop')
+        if not os.path.exists(desktop):
+            desktop = os.path.expanduser('~')
+        
+        # Create a 'Bills' folder if it doesn't exist
+        bills_folder = os.path.join(desktop, 'CIB_Bills')
+        os.makedirs(bills_folder, exist_ok=True)
+        
+        # Name the file after the bill number, which is unique across tills
+        filename = os.path.join(bills_folder, f"CIB_Bill_{bill_no}.txt")
+        with open(filename, "w") as f:
+            f.write(bill_text)
+        
+        # Also save a copy in the application directory for reference
+        with open(f"bill_{bill_no}.txt", "w") as f:
+            f.write(bill_text)
+        return filename, False
+    except OSError:
+        # Fallback to saving in the current directory if there's an issue
+        filename = f"bill_{bill_no}.txt"
+        with open(filename, "w") as f:
+            f.write(bill_text)
+        return filename, True
@@ -0,0 +1,67 @@
+"""Stock on hand and the journal of movements that changes it"""
+from datetime import datetime
+
+# Movement kinds accepted by the stock_movements table
+MOVEMENT_KINDS = ("sale", "receipt", "adjustment")
+
+# One journal row per sale line; the stock_movements_apply trigger
+# decrements each item's balance in the same statement
+SALE_MOVEMENTS_SQL = '''
+INSERT INTO stock_movements (item_id, kind, quantity, sale_id, moved_at)
+SELECT item_id, 'sale', -quantity, sale_id, ? FROM sale_lines WHERE sale_id=? AND item_id IS NOT NULL
+'''
+
+
+def record_movement(db, item_id, kind, quantity, moved_at=None, note=None):
+    """Journal one movement of an item and return the item's new balance"""
+    moved_at = moved_at or datetime.now()
+    with db.transaction(immediate=True) as cursor:
+        cursor.execute(
+            "INSERT INTO stock_movements (item_id, kind, quantity, moved_at, note) VALUES (?, ?, ?, ?, ?)",
+            (item_id, kind, quantity, moved_at.strftime("%Y-%m-%d %H:%M:%S"), note)
+        )
+        return cursor.execute("SELECT on_hand FROM stock WHERE item_id=?", (item_id,)).fetchone()[0]
+
+
+def record_sale_movements(cursor, sale_id, sold_at):
+    """Take the lines of a recorded sale out of stock; call inside the sale's transaction"""
+    cursor.execute(SALE_MOVEMENTS_SQL, (sold_at.strftime("%Y-%m-%d %H:%M:%S"), sale_id))
+
+
+def on_hand(db, item_id):
+    """Current balance of an item; items that never moved have none"""
+    row = db.query_one("SELECT on_hand FROM stock WHERE item_id=?", (item_id,))
+    return row[0] if row else 0
+
+
+def movements(db, item_id, limit=20):
+    """Latest (moved_at, kind, quantity, sale_id, note) rows of an item, newest first"""
+    return db.query_all(
+        "SELECT moved_at, kind, quantity, sale_id, note FROM stock_movements WHERE item_id=? ORDER BY id DESC LIMIT ?",
+        (item_id, limit)
+    )
+
+
+def rebuild_balances(db):
+    """Recompute every balance from the journal; returns the number of items fixed
+
+    The trigger keeps balances current, so this is only for repairing a
+    database edited by hand.
+    """
+    with db.transaction(immediate=True) as cursor:
+        cursor.execute("DROP TABLE IF EXISTS temp.journal_balances")
+        cursor.execute(
+            "CREATE TEMP TABLE journal_balances AS SELECT item_id, SUM(quantity) AS on_hand "
+            "FROM stock_movements WHERE item_id IS NOT NULL GROUP BY item_id"
+        )
+        fixed = cursor.execute(
+            "SELECT COUNT(*) FROM stock LEFT JOIN temp.journal_balances USING (item_id) "
+            "WHERE stock.on_hand IS NOT COALESCE(journal_balances.on_hand, 0)"
+        ).fetchone()[0]
+        fixed += cursor.execute(
+            "SELECT COUNT(*) FROM temp.journal_balances WHERE item_id NOT IN (SELECT item_id FROM stock)"
+        ).fetchone()[0]
+        cursor.execute("DELETE FROM stock")
+        cursor.execute("INSERT INTO stock (item_id, on_hand) SELECT item_id, on_hand FROM temp.journal_balances")
+        cursor.execute("DROP TABLE temp.journal_balances")
+    return fixed
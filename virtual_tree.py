@@ -0,0 +1,216 @@
+from tkinter import ttk
+
+from metrics import METRICS
+
+
+class VirtualTreeview:
+    """Drive a ttk.Treeview so only the rows currently on screen exist as items
+
+    The wrapped scrollbar is positioned against the full row count of the
+    source, and scrolling (scroll bar, mouse wheel, keyboard) fetches the next
+    window through the source's keyset pagination. Treeview iids are the row
+    keys, and the selection is tracked by key so it survives scrolling.
+    """
+
+    HEADER_HEIGHT = 24
+    DEFAULT_ROW_HEIGHT = 20
+
+    def __init__(self, tree, scrollbar):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.source = None
+        self.total = 0
+        self.top_index = 0
+        self.rows = []
+        self.visible = int(tree.cget("height"))
+        self.selected_keys = set()
+
+        self.scrollbar.configure(command=self.yview)
+        self.tree.configure(yscrollcommand="")
+        self.tree.bind("<Configure>", self._on_configure, add="+")
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.tree.bind("<ButtonPress-1>", self._on_click, add="+")
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_and_break(-1))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_and_break(1))
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda e: self._scroll_and_break(-self.visible))
+        self.tree.bind("<Next>", lambda e: self._scroll_and_break(self.visible))
+
+    def set_source(self, source):
+        """Show a new row source from the top, dropping the old selection"""
+        self.source = source
+        self.selected_keys.clear()
+        self.top_index = 0
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the row count and the visible window at the current position"""
+        self.total = self.source.count() if self.source else 0
+        self._jump(self.top_index)
+
+    def apply_change(self, old, new):
+        """Reflect one inserted (old=None), updated or deleted (new=None) row in place
+
+        Only the on-screen window is ever re-read, so the cost does not grow
+        with the size of the source.
+        """
+        if self.source is None:
+            return
+        was, now = self.source.apply_change(old, new)
+        if not (was or now):
+            return
+        key = (new or old)[0]
+        self.total += int(now) - int(was)
+        if not now:
+            self.selected_keys.discard(key)
+
+        if was and now and self.tree.exists(str(key)):
+            # Same position, new values
+            self.rows = [new if row[0] == key else row for row in self.rows]
+            self.tree.item(str(key), values=new[1:6])
+        elif self.rows and key < self.rows[0][0]:
+            # Above the window: everything on screen shifts by one position
+            self.top_index += int(now) - int(was)
+            self._update_scrollbar()
+        elif self.rows and key > self.rows[-1][0] and len(self.rows) >= self.visible:
+            # Below a full window: only the scroll range changes
+            self._update_scrollbar()
+        else:
+            self._refill()
+
+    def _refill(self):
+        """Re-read the window from its first key, pulling rows back in at the end"""
+        if not self.rows:
+            self._jump(self.top_index)
+            return
+        first = self.rows[0][0]
+        rows = self.source.rows_from(first, self.visible)
+        missing = min(self.visible - len(rows), self.top_index)
+        if missing > 0:
+            fetched = self.source.rows_before(rows[0][0] if rows else first, missing)
+            rows = fetched + rows
+            self.top_index -= len(fetched)
+        self._render(rows)
+
+    def selection_keys(self):
+        """Keys of every selected row, including ones scrolled out of view"""
+        return sorted(self.selected_keys)
+
+    def selected_rows(self):
+        """Full source rows for the selection, in key order"""
+        by_key = {row[0]: row for row in self.rows}
+        rows = []
+        for key in self.selection_keys():
+            row = by_key.get(key) or self.source.get(key)
+            if row:
+                rows.append(row)
+        return rows
+
+    def yview(self, *args):
+        """Scrollbar command: translate moveto/scroll into window fetches"""
+        if not args or not self.total:
+            return
+        if args[0] == "moveto":
+            self._jump(int(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible
+            self.scroll_by(step)
+
+    def scroll_by(self, step):
+        """Move the window by step rows, paging from the rows already on screen"""
+        if not self.rows or step == 0 or abs(step) >= self.visible:
+            self._jump(self.top_index + step)
+            return
+        if step > 0:
+            fetched = self.source.rows_after(self.rows[-1][0], step)
+            rows = (self.rows + fetched)[-self.visible:]
+            self.top_index += len(self.rows) + len(fetched) - len(rows)
+        else:
+            fetched = self.source.rows_before(self.rows[0][0], -step)
+            rows = (fetched + self.rows)[:self.visible]
+            self.top_index -= len(fetched)
+        self._render(rows)
+
+    def _jump(self, index):
+        self.top_index = max(0, min(index, self.total - self.visible))
+        rows = []
+        if self.total:
+            key = self.source.key_at(self.top_index)
+            if key is not None:
+                rows = self.source.rows_from(key, self.visible)
+        self._render(rows)
+
+    @METRICS.timed("tree:render")
+    def _render(self, rows):
+        """Make the Treeview hold exactly rows, reusing items that stay on screen"""
+        keep = {str(row[0]) for row in rows}
+        stale = [iid for iid in self.tree.get_children() if iid not in keep]
+        if stale:
+            self.tree.delete(*stale)
+        for index, row in enumerate(rows):
+            iid = str(row[0])
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=row[1:6])
+                self.tree.move(iid, "", index)
+            else:
+                self.tree.insert("", index, iid=iid, values=row[1:6])
+        self.rows = rows
+
+        visible_selected = [str(row[0]) for row in rows if row[0] in self.selected_keys]
+        if tuple(visible_selected) != self.tree.selection():
+            self.tree.selection_set(visible_selected)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self.total:
+            self.scrollbar.set(self.top_index / self.total,
+                               (self.top_index + len(self.rows)) / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _scroll_and_break(self, step):
+        self.scroll_by(step)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        step = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+        return self._scroll_and_break(step)
+
+    def _on_arrow(self, step):
+        """Let the Treeview move inside the window, scroll when leaving its edge"""
+        if not self.rows:
+            return None
+        edge = self.rows[-1] if step > 0 else self.rows[0]
+        if self.tree.focus() != str(edge[0]):
+            return None
+        self.scroll_by(step)
+        edge = self.rows[-1] if step > 0 else self.rows[0]
+        self.selected_keys = {edge[0]}
+        self.tree.selection_set(str(edge[0]))
+        self.tree.focus(str(edge[0]))
+        return "break"
+
+    def _on_click(self, event):
+        # A plain click on a row replaces the selection, including rows scrolled
+        # away; clicks on headings or empty space leave the selection alone
+        if event.state & 0x0005:  # Shift or Control
+            return
+        if self.tree.identify_region(event.x, event.y) in ("cell", "tree") and self.tree.identify_row(event.y):
+            self.selected_keys.clear()
+
+    def _on_select(self, event):
+        # Rows on screen take the Treeview's state; off-screen rows keep theirs
+        on_screen = {str(row[0]): row[0] for row in self.rows}
+        selected = {on_screen[iid] for iid in self.tree.selection() if iid in on_screen}
+        self.selected_keys = (self.selected_keys - set(on_screen.values())) | selected
+
+    def _on_configure(self, event):
+        row_height = ttk.Style(self.tree).lookup("Treeview", "rowheight") or self.DEFAULT_ROW_HEIGHT
+        visible = max(1, (event.height - self.HEADER_HEIGHT) // int(row_height))
+        if visible != self.visible:
+            self.visible = visible
+            self._jump(self.top_index)